@@ -15,10 +15,48 @@ class Settings:
         if o.strip()
     ]
 
+    # Database: SQLite file by default; any SQLAlchemy URL works (e.g. postgresql+psycopg://user:pw@host/db)
+    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./smartkitchen.db")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "8"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; server-side DBs only
+    DB_ECHO = os.getenv("DB_ECHO", "").lower() in ("1", "true", "yes")
+    # SQLite connection pragmas (see app/db/database.py)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
     # LLM provider (only Ollama now)
     LLM_PROVIDER = "ollama"
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+    OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+    # Max model calls in flight at once (the local server queues beyond this anyway)
+    OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+
+    # LLM generation cache: in-process LRU, plus a SQLite file when LLM_CACHE_PATH is set
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH") or None
+    LLM_CACHE_MAX_DISK_ENTRIES = int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", "10000"))
+
+    # Per-process caches. Writes made through this process update them at once.
+    # Writes from another process (another worker, a Postgres client, the
+    # bulk_data CLI) reach a worker's pantry cache within PANTRY_CACHE_TTL_SECONDS.
+    # The recipe index only sees them after a restart, so run catalog writes
+    # through a single API process.
+    PANTRY_CACHE_TTL_SECONDS = float(os.getenv("PANTRY_CACHE_TTL_SECONDS", "5"))
+    PANTRY_CACHE_MAX_OWNERS = int(os.getenv("PANTRY_CACHE_MAX_OWNERS", "10000"))
+    # /recipes/suggest and /recipes/search result cache (see app/services/response_cache.py)
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    # Directory of a nutrient store built by app/scripts/load_nutrition.py (unset: built-in table only)
+    NUTRITION_STORE_PATH = os.getenv("NUTRITION_STORE_PATH") or None
+
+    # Persisted recipe macro matrix, next to the SQLite file by default ("" disables persistence)
+    MACRO_MATRIX_PATH = os.getenv("MACRO_MATRIX_PATH", "./smartkitchen.macros.npz") or None
 
 @lru_cache
 def get_settings() -> Settings:
@@ -0,0 +1,21 @@
+# apps/api/app/core/owner.py
+"""
+Which household a request acts for.
+
+Clients send X-Owner-Id. Requests without it act for DEFAULT_OWNER, which
+also owns every row created before owners existed, so single-household
+setups keep working unchanged.
+"""
+from typing import Optional
+
+from fastapi import Header
+
+from app.db.models import DEFAULT_OWNER
+
+OWNER_HEADER = "X-Owner-Id"
+
+
+def get_owner_id(
+    x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER, max_length=64, pattern=r"^[A-Za-z0-9_.:@-]*$"),
+) -> str:
+    return x_owner_id or DEFAULT_OWNER
@@ -1,12 +1,115 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
 
-# SQLite file in the apps/api directory
-DATABASE_URL = "sqlite:///./smartkitchen.db"
+from app.core.config import Settings, get_settings
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+settings = get_settings()
+
+# SQLite file in the apps/api directory unless DATABASE_URL says otherwise
+DATABASE_URL = settings.DATABASE_URL
+
+
+def _sqlite_pragmas(dbapi_conn, _record, settings: Settings) -> None:
+    cur = dbapi_conn.cursor()
+    # WAL: readers don't block the writer and vice versa; NORMAL is durable
+    # across app crashes with WAL (only an OS crash can lose the last commits)
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cur.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    cur.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.close()
+
+
+def make_engine(url: str, settings: Settings) -> Engine:
+    """
+    Engine for url, tuned by settings. SQLite file databases get WAL and the
+    pragmas above on every pooled connection. In-memory SQLite shares one
+    connection. Anything else (e.g. postgresql+psycopg://...) gets a
+    pre-pinged, recycled QueuePool.
+    """
+    u = make_url(url)
+    if u.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            echo=settings.DB_ECHO,
+        )
+
+    if u.database in (None, "", ":memory:"):
+        return create_engine(
+            url, connect_args={"check_same_thread": False}, poolclass=StaticPool, echo=settings.DB_ECHO
+        )
+
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        echo=settings.DB_ECHO,
+    )
+    event.listen(engine, "connect", lambda conn, rec: _sqlite_pragmas(conn, rec, settings))
+    return engine
+
+
+# async drivers for the sync URLs above; psycopg 3 does both under one dialect
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "psycopg"}
+
+
+def async_url(url: str) -> URL:
+    """url with its driver swapped for the async one (sqlite -> sqlite+aiosqlite)."""
+    u = make_url(url)
+    if u.get_dialect().is_async:
+        return u
+    driver = _ASYNC_DRIVERS.get(u.get_backend_name())
+    if driver is None:
+        raise ValueError(f"no async driver known for {u.get_backend_name()!r}")
+    return u.set(drivername=f"{u.get_backend_name()}+{driver}")
+
+
+def make_async_engine(url: str, settings: Settings) -> AsyncEngine:
+    """Async twin of make_engine: same pool sizes and the same SQLite pragmas."""
+    u = async_url(url)
+    if u.get_backend_name() != "sqlite":
+        return create_async_engine(
+            u,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            echo=settings.DB_ECHO,
+        )
+
+    if u.database in (None, "", ":memory:"):
+        return create_async_engine(u, poolclass=StaticPool, echo=settings.DB_ECHO)
+
+    engine = create_async_engine(
+        u,
+        connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        echo=settings.DB_ECHO,
+    )
+    event.listen(engine.sync_engine, "connect", lambda conn, rec: _sqlite_pragmas(conn, rec, settings))
+    return engine
+
+
+engine = make_engine(DATABASE_URL, settings)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by the read-heavy endpoints so they don't hold a threadpool worker per request
+async_engine = make_async_engine(DATABASE_URL, settings)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
@@ -0,0 +1,98 @@
+# apps/api/app/db/migrations.py
+"""
+Additive schema upgrades for existing databases.
+
+Base.metadata.create_all creates missing tables but never touches tables
+that already exist. add_missing_columns fills that gap for additive changes:
+new columns that are nullable or have a server default, and new indexes on
+existing tables. Anything destructive or type-changing needs a real
+migration. A column whose existing rows need more than a default gets a
+backfill in BACKFILLS, run in the same transaction that adds the column.
+"""
+from typing import Callable, Dict, List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.database import Base
+from app.db.models import LEGACY_MACROS_VERSION
+
+# The estimator that filled missing macros before macros_version existed:
+# first word of each comma-separated part -> (calories, protein, carbs, fat
+# per 100 g, default grams). Frozen, so it recognizes what it wrote however
+# the live nutrition tables change.
+_LEGACY_FOODS = {
+    "egg": (155, 13, 1.1, 11, 50), "rice": (130, 2.7, 28, 0.3, 150), "bread": (265, 9, 49, 3.2, 60),
+    "butter": (717, 0.9, 0.1, 81, 10), "tomato": (18, 0.9, 3.9, 0.2, 100), "paneer": (321, 21, 3.6, 25, 120),
+    "tofu": (76, 8, 1.9, 4.8, 120), "oats": (389, 17, 66, 7, 40), "chickpeas": (164, 9, 27, 2.6, 120),
+    "cheese": (402, 25, 1.3, 33, 40), "maggi": (436, 10, 60, 17, 70), "peanut": (567, 26, 16, 49, 20),
+    "curd": (98, 11, 3.4, 5, 200), "milk": (60, 3.2, 5, 3.3, 200), "oil": (884, 0, 0, 100, 10),
+    "soy": (446, 36, 30, 20, 30),
+}
+
+
+def _legacy_estimate(ingredients: str) -> tuple:
+    totals = [0.0, 0.0, 0.0, 0.0]
+    for part in (ingredients or "").split(","):
+        words = part.strip().lower().split()
+        food = _LEGACY_FOODS.get(words[0]) if words else None
+        if food is None:
+            continue
+        factor = food[4] / 100.0
+        for i in range(4):
+            totals[i] += food[i] * factor
+    return tuple(int(round(v)) for v in totals)
+
+
+def _stamp_legacy_macros(conn: Connection) -> None:
+    """
+    Before macros were versioned, NULL macros_version meant nothing; now it
+    means "entered by hand", which recompute jobs leave alone. Rows whose
+    macros are exactly what the original estimator gives for their
+    ingredients were estimated, so mark them LEGACY_MACROS_VERSION (which no
+    job version matches) and the next job re-estimates them.
+    """
+    rows = conn.execute(
+        text(
+            "SELECT id, ingredients, calories, protein, carbs, fat FROM recipes WHERE calories IS NOT NULL "
+            "AND protein IS NOT NULL AND carbs IS NOT NULL AND fat IS NOT NULL"
+        )
+    )
+    stale = [
+        {"id": r.id, "version": LEGACY_MACROS_VERSION}
+        for r in rows
+        if any(r[2:]) and (r.calories, r.protein, r.carbs, r.fat) == _legacy_estimate(r.ingredients)
+    ]
+    if stale:
+        conn.execute(text("UPDATE recipes SET macros_version = :version WHERE id = :id"), stale)
+
+
+BACKFILLS: Dict[str, Callable[[Connection], None]] = {
+    "recipes.macros_version": _stamp_legacy_macros,
+}
+
+
+def add_missing_columns(engine: Engine) -> List[str]:
+    """ALTER TABLE ... ADD COLUMN for model columns the database lacks, then create missing indexes."""
+    insp = inspect(engine)
+    added: List[str] = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            have = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in have:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}"
+                # a server default fills the existing rows, which also lets the column be NOT NULL
+                default = engine.dialect.ddl_compiler(engine.dialect, None).get_column_default_string(col)
+                if default is not None:
+                    ddl += f" DEFAULT {default}" + ("" if col.nullable else " NOT NULL")
+                conn.execute(text(ddl))
+                added.append(f"{table.name}.{col.name}")
+                if added[-1] in BACKFILLS:
+                    BACKFILLS[added[-1]](conn)
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    return added
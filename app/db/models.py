@@ -1,16 +1,27 @@
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import Column, Integer, String, Date, Index
 from .database import Base
 
+# household that owns rows created without an X-Owner-Id header (and all rows from before owners existed)
+DEFAULT_OWNER = "default"
+# macros_version of macros the original, unversioned estimator wrote (see app/db/migrations.py)
+LEGACY_MACROS_VERSION = "legacy"
+
 class PantryItem(Base):
     __tablename__ = "pantry_items"
+    __table_args__ = (
+        # every pantry query is scoped to one owner
+        Index("ix_pantry_items_owner_name", "owner_id", "name"),
+        Index("ix_pantry_items_owner_expiry", "owner_id", "expiry_date"),  # range scans for "expiring soon"
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(String, nullable=False, default=DEFAULT_OWNER, server_default=DEFAULT_OWNER)
     name = Column(String, index=True)
     quantity = Column(Integer)
     unit = Column(String)
     expiry_date = Column(Date, nullable=True)
 
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text, Float, Index, Boolean, DateTime
 from sqlalchemy.orm import relationship
 
 # PantryItem class (already exists above)
@@ -27,4 +38,63 @@ class Recipe(Base):
     protein = Column(Integer, nullable=True)
     carbs = Column(Integer, nullable=True)
     fat = Column(Integer, nullable=True)
-    time_minutes = Column(Integer, nullable=True, default=15)
\ No newline at end of file
+    time_minutes = Column(Integer, nullable=True, default=15)
+    # nutrition_version() that estimated the macros; NULL when they were given explicitly
+    macros_version = Column(String, nullable=True)
+
+    ingredient_links = relationship(
+        "RecipeIngredient",
+        order_by="RecipeIngredient.position",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class Ingredient(Base):
+    __tablename__ = "ingredients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True, index=True)  # normalized: stripped, lowercase
+
+
+class RecipeIngredient(Base):
+    """One ingredient of a recipe; the normalized form of Recipe.ingredients."""
+    __tablename__ = "recipe_ingredients"
+    __table_args__ = (
+        # ingredient -> recipes lookups (membership / overlap queries)
+        Index("ix_recipe_ingredients_ingredient_recipe", "ingredient_id", "recipe_id"),
+    )
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, nullable=False, default=0)  # order in the original string
+    grams = Column(Float, nullable=True)
+    unit = Column(String, nullable=True)
+
+    ingredient = relationship(Ingredient, lazy="joined")
+
+
+class MacroJob(Base):
+    """A (resumable) batch recompute of estimated recipe macros."""
+    __tablename__ = "macro_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, nullable=False, default="pending")  # pending | running | done | failed
+    full = Column(Boolean, nullable=False, default=False)  # every recipe, not just missing/outdated ones
+    nutrition_version = Column(String, nullable=False)
+    last_recipe_id = Column(Integer, nullable=False, default=0)  # resume cursor: last committed chunk
+    total = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class SavedRecipe(Base):
+    """A recipe an owner (household) bookmarked."""
+    __tablename__ = "saved_recipes"
+
+    owner_id = Column(String, primary_key=True)  # the PK's (owner_id, recipe_id) order serves per-owner lookups
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime, nullable=False)
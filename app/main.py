@@ -1,11 +1,40 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.db.models import Base
-from app.db.database import engine
+from app.db.database import async_engine, engine, SessionLocal
+from app.db.migrations import add_missing_columns
 from app.routers import pantry, recipe ,llm_recipes # add others as you create them
+from app.services.ingredients import backfill_recipe_ingredients
+from app.services.macro_jobs import resume_unfinished
+from app.services.recipe_index import recipe_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Normalize any recipes added before recipe_ingredients existed, then warm
+    # the in-memory recipe index so the first suggest/search doesn't pay for it
+    db = SessionLocal()
+    try:
+        backfill_recipe_ingredients(db)
+        recipe_index.build(db)
+        # pick up macro recompute jobs interrupted by a crash/restart
+        resume_unfinished(db)
+    finally:
+        db.close()
+    yield
+    await llm_recipes.llm.aclose()
+    db = SessionLocal()
+    try:
+        recipe_index.save_macros(db)
+    finally:
+        db.close()
+    await async_engine.dispose()
+
 
-app = FastAPI(title="AI Digital Dietician API")
+app = FastAPI(title="AI Digital Dietician API", lifespan=lifespan)
 
 # ✅ CORS must be enabled, and allow OPTIONS + headers
 app.add_middleware(
@@ -17,10 +46,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],   # <-- includes OPTIONS
     allow_headers=["*"],   # <-- include common/custom headers
+    expose_headers=["X-Next-Cursor", "ETag"],  # pagination cursor of the /list endpoints; suggest/search validators
 )
 
 # DB init
 Base.metadata.create_all(bind=engine)
+add_missing_columns(engine)
 
 # Routes
 @app.get("/health")
@@ -0,0 +1,206 @@
+# apps/api/app/ml/cache.py
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+def canonical_key(payload: Dict[str, Any]) -> str:
+    """sha256 over a canonical JSON encoding (sorted keys, no whitespace)."""
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def generation_key(
+    ingredients: Iterable[str],
+    cuisine: Optional[str],
+    calorie_cap: Optional[int],
+    count: int,
+    model: str,
+    prompt_version: str,
+    mode: str = "fanout",
+) -> str:
+    """
+    Key for one generation request; ingredient order, case and duplicates
+    don't matter. mode separates results generated differently (one call
+    per recipe vs one streamed call for all of them).
+    """
+    return canonical_key({
+        "ingredients": sorted({i.strip().lower() for i in ingredients if i and i.strip()}),
+        "cuisine": (cuisine or "").strip().lower() or None,
+        "calorie_cap": calorie_cap,
+        "count": max(1, count),
+        "model": model,
+        "prompt_version": prompt_version,
+        "mode": mode,
+    })
+
+
+_MISS = object()
+
+
+class GenerationCache:
+    """
+    Two-tier TTL cache for LLM generations.
+
+    Tier 1 is an in-process LRU (max_entries). Tier 2, when sqlite_path is
+    set, is a SQLite table that survives restarts; it is trimmed to about
+    max_disk_entries by last access, every trim_every writes rather than on
+    each one. Values must be JSON-serializable and come back as fresh copies.
+
+    aget/aset are for async callers: the memory tier is answered inline and
+    the SQLite tier runs in a worker thread, so disk I/O never blocks the
+    event loop. The two tiers have separate locks for the same reason.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 86400,
+        sqlite_path: Optional[str] = None,
+        max_disk_entries: int = 10000,
+        trim_every: int = 100,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.trim_every = max(1, trim_every)
+        self._mem: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (expires_at, json)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes = 0  # disk writes since the last trim
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+            self._db.commit()
+
+    # ---------- lookups ----------
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is _MISS:
+            value = self._get_disk(key, now)
+        return value
+
+    async def aget(self, key: str) -> Optional[Any]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is _MISS and self._db is not None:
+            value = await asyncio.to_thread(self._get_disk, key, now)
+        elif value is _MISS:
+            value = self._get_disk(key, now)  # no disk tier: just counts the miss
+        return value
+
+    def _get_memory(self, key: str, now: float) -> Any:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is None:
+                return _MISS
+            expires_at, blob = hit
+            if expires_at > now:
+                self._mem.move_to_end(key)
+                self._counters["hits"] += 1
+                self._counters["memory_hits"] += 1
+                return json.loads(blob)
+            del self._mem[key]
+            self._counters["expired"] += 1
+            return _MISS
+
+    def _get_disk(self, key: str, now: float) -> Optional[Any]:
+        row = None
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] + self.ttl > now:
+                    self._db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                elif row is not None:
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+        with self._lock:
+            if row is not None and row[1] + self.ttl > now:
+                self._remember(key, row[1] + self.ttl, row[0])
+                self._counters["hits"] += 1
+                self._counters["disk_hits"] += 1
+                return json.loads(row[0])
+            if row is not None:
+                self._counters["expired"] += 1
+            self._counters["misses"] += 1
+            return None
+
+    # ---------- writes ----------
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        blob = self._set_memory(key, value, now)
+        if self._db is not None:
+            self._put_disk(key, blob, now)
+
+    async def aset(self, key: str, value: Any) -> None:
+        now = time.time()
+        blob = self._set_memory(key, value, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_disk, key, blob, now)
+
+    def _set_memory(self, key: str, value: Any, now: float) -> str:
+        blob = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, now + self.ttl, blob)
+        return blob
+
+    def _put_disk(self, key: str, blob: str, now: float) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, blob, now, now),
+            )
+            self._writes += 1
+            if self._writes >= self.trim_every:
+                self._trim(now)
+            self._db.commit()
+
+    def _trim(self, now: float) -> None:
+        """Drop expired rows and all but the max_disk_entries most recently used. Caller holds _db_lock."""
+        self._db.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+        self._writes = 0
+
+    def _remember(self, key: str, expires_at: float, blob: str) -> None:
+        self._mem[key] = (expires_at, blob)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+                self._writes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._counters)
+            out["memory_entries"] = len(self._mem)
+        if self._db is not None:
+            with self._db_lock:
+                out["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+        return out
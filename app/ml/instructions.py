@@ -0,0 +1,77 @@
+# apps/api/app/ml/instructions.py
+"""
+Post-processing for model-written recipe instructions.
+
+Contract of fix_instructions(x):
+
+* Input is a list of steps, a single string, or anything else (-> no steps).
+  Strings split at newlines, after sentence-ending punctuation (.!?)
+  followed by whitespace, and before inline step markers ("2. ", "3) ").
+* Fragments shorter than 4 chars are dropped. With fewer than 5 steps, a
+  split on ';' is used if it yields at least 5; if still short, steps are
+  split on " and " / " then ". At most 12 steps are kept.
+* Existing numbering ("3.", "4)") is stripped from each step; decimals
+  such as "1.5 cups" are left alone.
+* A short step (< 20 chars) is replaced by DEFAULT_STEP when it is vague:
+  it contains a banned phrase, doesn't start with a letter, or (under 17
+  chars) has no time/heat cue.
+* Output is padded with DEFAULT_STEP to at least 5 steps and numbered
+  "1. ...", "2. ...", ... in order.
+"""
+import re
+from typing import Any, List
+
+BAD_PHRASES = ("to taste", "cook to taste", "prep ingredients", "serve")
+DEFAULT_STEP = "Add and cook on medium heat for 2–3 min."
+MIN_STEPS, MAX_STEPS = 5, 12
+
+_SPLIT_TEXT = re.compile(r"\n+|(?<=[.!?])\s+|;?\s+(?=\d{1,2}[.)]\s)")
+_SPLIT_SEMI = re.compile(r";\s*")
+_SPLIT_AND_THEN = re.compile(r"\s+(?:and|then)\s+")
+_NUMBERING = re.compile(r"^\s*\d{1,2}\s*[.)](?!\d)\s*")
+_HAS_CUE = re.compile(r"\b(?:min|sec|seconds|minutes|medium|low|high|simmer|boil|°|degree|heat)\b")
+_BAD = re.compile("|".join(re.escape(p) for p in BAD_PHRASES))
+
+
+def _split(x: Any) -> List[str]:
+    if isinstance(x, list):
+        parts = [str(p).strip() for p in x]
+    elif isinstance(x, str):
+        parts = [p.strip() for p in _SPLIT_TEXT.split(x.strip())]
+    else:
+        parts = []
+    parts = [p for p in parts if len(p) >= 4]
+
+    # If too short, try splitting by semicolons
+    if len(parts) < MIN_STEPS:
+        alt = [s for p in parts for s in (c.strip() for c in _SPLIT_SEMI.split(p)) if s]
+        if len(alt) >= MIN_STEPS:
+            parts = alt
+    parts = parts[:MAX_STEPS]
+
+    # As a last resort, split long items by ' and ' / ' then '
+    if 0 < len(parts) < MIN_STEPS:
+        parts = [c for p in parts for c in (c.strip() for c in _SPLIT_AND_THEN.split(p)) if c][:MAX_STEPS]
+    return parts
+
+
+def _is_vague(body: str) -> bool:
+    low = body.lower()
+    if _BAD.search(low):
+        return True
+    if not (body[:1].isascii() and body[:1].isalpha()):
+        return True
+    return len(body) < 17 and not _HAS_CUE.search(low)
+
+
+def fix_instructions(x: Any) -> List[str]:
+    """Normalize model instructions into 5–12 numbered, concrete steps (see module docstring)."""
+    out: List[str] = []
+    for part in _split(x):
+        body = _NUMBERING.sub("", part, count=1)
+        if len(body) < 20 and _is_vague(body):
+            body = DEFAULT_STEP
+        out.append(f"{len(out) + 1}. {body}")
+    while len(out) < MIN_STEPS:
+        out.append(f"{len(out) + 1}. {DEFAULT_STEP}")
+    return out
@@ -0,0 +1,195 @@
+# apps/api/app/ml/json_stream.py
+"""
+Incremental JSON extraction from model output.
+
+Both parsers here share one balanced-brace scanner. Each chunk is scanned
+exactly once, when it arrives, jumping between structural characters with
+compiled regexes rather than stepping char by char. String and escape
+state and the open-container stack carry over between chunks, so a brace
+inside a string value never counts. Prose outside the JSON is skipped.
+Chunks are joined only when a complete object needs decoding, which
+happens in place with JSONDecoder.raw_decode.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_DECODER = json.JSONDecoder()
+_STRUCTURAL = re.compile(r'[][{}"]')
+_STRING_STOP = re.compile(r'["\\]')
+_KEY_BEFORE = re.compile(r'"((?:[^"\\]|\\.)*)"\s*:\s*$')
+
+
+class _BraceScanner:
+    """Scanning core; subclasses react to container opens/closes via _open/_close."""
+
+    def __init__(self) -> None:
+        self._parts: List[str] = []
+        self._size = 0
+        self._joined = ""
+        self._stack: List[str] = []
+        self._in_string = False
+        self._skip_next = False  # previous chunk ended on a backslash inside a string
+        self._stack_tag: Optional[str] = None  # set by _open to tag the container being opened
+        self.done = False
+
+    def _feed_text(self, chunk: str) -> None:
+        if self.done or not chunk:
+            return
+        base = self._size
+        self._parts.append(chunk)
+        self._size += len(chunk)
+        stack, n, i = self._stack, len(chunk), 0
+        if self._skip_next:
+            self._skip_next = False
+            i = 1
+        while i < n and not self.done:
+            if self._in_string:
+                m = _STRING_STOP.search(chunk, i)
+                if m is None:
+                    break
+                if m.group() == "\\":
+                    i = m.end() + 1
+                    self._skip_next = i > n
+                else:
+                    self._in_string = False
+                    i = m.end()
+                continue
+            if not stack:
+                j = chunk.find("{", i)
+                if j < 0:
+                    break
+                self._open("{", base + j)
+                stack.append("{")
+                i = j + 1
+                continue
+            m = _STRUCTURAL.search(chunk, i)
+            if m is None:
+                break
+            ch, i = m.group(), m.end()
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{" or ch == "[":
+                self._open(ch, base + m.start())
+                stack.append(ch if ch == "{" or self._stack_tag is None else self._stack_tag)
+                self._stack_tag = None
+            else:
+                stack.pop()
+                self._close(ch, base + m.start())
+
+    # Hooks, called with the stack as it was before the open / after the close.
+    # Offsets are absolute positions in everything fed so far.
+    def _open(self, ch: str, at: int) -> None:
+        pass
+
+    def _close(self, ch: str, at: int) -> None:
+        pass
+
+    def _text(self) -> str:
+        if len(self._joined) != self._size:
+            self._joined = "".join(self._parts)
+            self._parts = [self._joined]
+        return self._joined
+
+    def _decode(self, start: int) -> Any:
+        try:
+            return _DECODER.raw_decode(self._text(), start)[0]
+        except ValueError:
+            return None
+
+
+class JsonObjectScanner(_BraceScanner):
+    """
+    Finds the first complete, valid top-level JSON object in text that may
+    arrive in chunks. feed() returns None until the object is available. A
+    balanced top-level '{...}' span that is not JSON (e.g. prose braces) is
+    skipped as a whole; nothing nested inside it is considered.
+
+    eager=True is for text that is already complete: each top-level '{' is
+    tried with raw_decode as soon as it is seen, so clean JSON costs one
+    C-level parse and the scanner only walks spans that fail.
+    """
+
+    def __init__(self, eager: bool = False) -> None:
+        super().__init__()
+        self._eager = eager
+        self._start = -1
+        self.result: Any = None
+
+    def feed(self, chunk: str) -> Any:
+        self._feed_text(chunk)
+        return self.result
+
+    def _accept(self, start: int) -> None:
+        obj = self._decode(start)
+        if obj is not None:
+            self.result = obj
+            self.done = True
+
+    def _open(self, ch: str, at: int) -> None:
+        if not self._stack:
+            self._start = at
+            if self._eager:
+                self._accept(at)
+
+    def _close(self, ch: str, at: int) -> None:
+        if not self._stack and not self._eager:
+            self._accept(self._start)
+
+
+def extract_first_object(text: str) -> Optional[Dict[str, Any]]:
+    """First complete top-level JSON object in text, or None."""
+    obj = JsonObjectScanner(eager=True).feed(text)
+    return obj if isinstance(obj, dict) else None
+
+
+class RecipeStreamParser(_BraceScanner):
+    """
+    Incremental parser for streamed model output.
+
+    Feed it text chunks as they arrive; each call returns the recipe objects
+    that were completed by that chunk. It understands both shapes the prompt
+    allows: {"recipes": [{...}, {...}]} (each element is emitted the moment
+    its closing brace arrives) and a single top-level recipe object (emitted
+    when it closes). Text before the first '{' is ignored.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._top_start = -1
+        self._item_start = -1
+        self._out: List[Dict[str, Any]] = []
+        self.emitted = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._out = []
+        self._feed_text(chunk)
+        self.emitted += len(self._out)
+        return self._out
+
+    def _open(self, ch: str, at: int) -> None:
+        depth = len(self._stack)
+        if depth == 0:
+            self._top_start = at
+        elif ch == "{" and depth == 2 and self._stack[1] == "R":
+            self._item_start = at
+        elif ch == "[" and depth == 1 and self._key_before(at) == "recipes":
+            self._stack_tag = "R"  # this array holds the recipes
+
+    def _close(self, ch: str, at: int) -> None:
+        depth = len(self._stack)
+        if ch == "}" and depth == 2 and self._stack[1] == "R" and self._item_start >= 0:
+            obj = self._decode(self._item_start)
+            self._item_start = -1
+            if isinstance(obj, dict):
+                self._out.append(obj)
+        elif ch == "}" and depth == 0:
+            self.done = True
+            if not self.emitted and not self._out:
+                top = self._decode(self._top_start)
+                if isinstance(top, dict) and "recipes" not in top:
+                    self._out.append(top)
+
+    def _key_before(self, at: int) -> Optional[str]:
+        m = _KEY_BEFORE.search(self._text(), max(0, at - 64), at)
+        return m.group(1) if m else None
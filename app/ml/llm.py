@@ -1,37 +1,50 @@
 # apps/api/app/ml/llm.py
-import json, re, traceback
+import asyncio, copy, json, traceback
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, Optional, AsyncIterator
 from fastapi import HTTPException
 from app.core.config import get_settings
+from app.ml.json_stream import extract_first_object
+from app.ml.singleflight import SingleFlight
 
 settings = get_settings()
 
 def _extract_json_obj(s: str) -> Dict[str, Any]:
     """
-    Try strict parse; if it fails, extract the largest {...} block and parse that.
-    Handles cases where models wrap JSON with text.
+    Return the first complete top-level JSON object in s.
+    Handles cases where models wrap JSON with text (see app.ml.json_stream).
     """
-    s = s.strip()
-    # 1) strict
-    try:
-        return json.loads(s)
-    except Exception:
-        pass
-    # 2) find first '{' and last '}' and try substring
-    start = s.find("{")
-    end = s.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        candidate = s[start:end+1]
-        try:
-            return json.loads(candidate)
-        except Exception:
-            # 3) last resort: grab the first JSON object via regex (non-greedy, balanced-ish)
-            # This won’t be perfect for deeply nested, but good enough for LLM outputs.
-            m = re.search(r"\{.*\}", s, re.DOTALL)
-            if m:
-                return json.loads(m.group(0))
-    raise HTTPException(status_code=500, detail=f"Ollama JSON parse failed. content={s[:300]}...")
+    obj = extract_first_object(s)
+    if obj is None:
+        raise HTTPException(status_code=500, detail=f"Ollama JSON parse failed. content={s.strip()[:300]}...")
+    return obj
+
+SYSTEM_PROMPT = "Return STRICT JSON ONLY. No prose. Keys: title, ingredients(array of strings), instructions(array of strings), macros(object with calories, protein, carbs, fat)."
+
+
+def _chat_body(model: str, prompt: str, stream: bool = False) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "format": "json",
+        "options": {"temperature": 0.3},
+        "stream": stream  # 🔒 single, non-streamed response unless explicitly streaming
+    }
+
+
+def _parse_chat_response(r: httpx.Response) -> Dict[str, Any]:
+    if r.status_code >= 400:
+        raise HTTPException(status_code=r.status_code, detail=r.text)
+    data = r.json()
+    # Ollama chat returns: {"message":{"role":"assistant","content":"..."},"done":true,...}
+    raw = (data.get("message") or {}).get("content", "")
+    if not raw:
+        raise HTTPException(status_code=500, detail=f"Ollama returned empty content: {data}")
+    return _extract_json_obj(raw)
+
 
 class LLMProvider:
     def __init__(self):
@@ -47,29 +60,100 @@ class LLMProvider:
         then tolerantly extracts a JSON object from the response.
         """
         url = f"{self.ollama_url}/api/chat"
-        body = {
-            "model": self.ollama_model,
-            "messages": [
-                {"role": "system", "content": "Return STRICT JSON ONLY. No prose. Keys: title, ingredients(array of strings), instructions(array of strings), macros(object with calories, protein, carbs, fat)."},
-                {"role": "user", "content": prompt}
-            ],
-            "format": "json",
-            "options": {"temperature": 0.3},
-            "stream": False  # 🔒 ensure a single, non-streamed response
+        body = _chat_body(self.ollama_model, prompt)
+        try:
+            with httpx.Client(timeout=settings.OLLAMA_TIMEOUT) as client:
+                return _parse_chat_response(client.post(url, json=body))
+        except HTTPException:
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Ollama call failed: {e}")
+
+
+class AsyncLLMProvider:
+    """
+    Async twin of LLMProvider for async endpoints.
+
+    One connection-pooled httpx.AsyncClient is shared by every request, and
+    a semaphore caps how many model calls are in flight at once. Concurrent
+    generate_json calls with the same prompt share a single model call.
+    Call aclose() on shutdown.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.ollama_url = settings.OLLAMA_BASE_URL
+        self.ollama_model = settings.OLLAMA_MODEL
+        self.max_concurrency = max_concurrency or settings.OLLAMA_MAX_CONCURRENCY
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._flights = SingleFlight()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.ollama_url,
+                timeout=httpx.Timeout(settings.OLLAMA_TIMEOUT, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def generate_json(self, prompt: str) -> Dict[str, Any]:
+        data = await self._flights.do((self.ollama_model, prompt), lambda: self._ollama_json(prompt))
+        # every coalesced caller gets its own copy to post-process
+        return copy.deepcopy(data)
+
+    def flight_stats(self) -> Dict[str, int]:
+        return {
+            "started": self._flights.started,
+            "coalesced": self._flights.coalesced,
+            "in_flight": self._flights.in_flight(),
         }
+
+    async def _ollama_json(self, prompt: str) -> Dict[str, Any]:
+        body = _chat_body(self.ollama_model, prompt)
         try:
-            with httpx.Client(timeout=120) as client:
-                r = client.post(url, json=body)
-                if r.status_code >= 400:
-                    raise HTTPException(status_code=r.status_code, detail=r.text)
-                data = r.json()
-                # Ollama chat returns: {"message":{"role":"assistant","content":"..."},"done":true,...}
-                raw = (data.get("message") or {}).get("content", "")
-                if not raw:
-                    raise HTTPException(status_code=500, detail=f"Ollama returned empty content: {data}")
-                return _extract_json_obj(raw)
+            async with self._slots:
+                r = await self._get_client().post("/api/chat", json=body)
+            return _parse_chat_response(r)
         except HTTPException:
             raise
         except Exception as e:
             traceback.print_exc()
             raise HTTPException(status_code=500, detail=f"Ollama call failed: {e}")
+
+    async def stream_text(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Calls Ollama chat API with stream=True and yields the assistant
+        content piece by piece as NDJSON chunks arrive.
+        """
+        body = _chat_body(self.ollama_model, prompt, stream=True)
+        try:
+            async with self._slots:
+                async with self._get_client().stream("POST", "/api/chat", json=body) as r:
+                    if r.status_code >= 400:
+                        raise HTTPException(status_code=r.status_code, detail=(await r.aread()).decode(errors="replace"))
+                    async for line in r.aiter_lines():
+                        if not line.strip():
+                            continue
+                        data = json.loads(line)
+                        if data.get("error"):
+                            raise HTTPException(status_code=500, detail=f"Ollama stream error: {data['error']}")
+                        piece = (data.get("message") or {}).get("content", "")
+                        if piece:
+                            yield piece
+                        if data.get("done"):
+                            break
+        except HTTPException:
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Ollama stream failed: {e}")
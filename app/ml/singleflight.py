@@ -0,0 +1,58 @@
+# apps/api/app/ml/singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent async calls that share a key onto one in-flight task.
+
+    The first caller for a key starts the work as its own task; later callers
+    await the same task. Every waiter gets the same result, or the same
+    exception. A waiter that is cancelled only stops waiting: the shared
+    work keeps running for the others, and is cancelled only when its
+    last waiter leaves. Once the task finishes the key is forgotten, so
+    nothing is cached beyond the flight.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t, key=key, call=call: self._forget(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            # shield: cancelling this waiter must not cancel the shared task
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # forget first: a caller arriving before the task unwinds
+                # must start fresh work, not join a cancelled flight
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
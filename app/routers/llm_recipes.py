@@ -1,19 +1,37 @@
 # apps/api/app/routers/llm_recipes.py
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from app.ml.llm import LLMProvider
-import re
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, AsyncIterator
+from app.core.config import get_settings
+from app.ml.llm import AsyncLLMProvider
+from app.ml.json_stream import RecipeStreamParser
+from app.ml.cache import GenerationCache, generation_key
+from app.ml.instructions import fix_instructions
+import asyncio
+import json
 
 router = APIRouter(prefix="/recipes", tags=["llm"])
-llm = LLMProvider()
+llm = AsyncLLMProvider()
+
+settings = get_settings()
+generation_cache = GenerationCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    sqlite_path=settings.LLM_CACHE_PATH,
+    max_disk_entries=settings.LLM_CACHE_MAX_DISK_ENTRIES,
+)
+
+
+# Each requested recipe is its own model call, so one request may ask for at most this many
+MAX_RECIPES_PER_REQUEST = 6
 
 
 class RecipeRequest(BaseModel):
     ingredients: List[str]
     cuisine: Optional[str] = None
     calorie_cap: Optional[int] = None
-    count: int = 2
+    count: int = Field(2, ge=1, le=MAX_RECIPES_PER_REQUEST)
 
 
 class LlmRecipe(BaseModel):
@@ -24,6 +42,10 @@ class LlmRecipe(BaseModel):
     macros: Dict[str, float]
 
 
+# Bump whenever SYSTEM_RULES / build_prompt / post-processing change output,
+# so cached generations from the old template are not served.
+PROMPT_VERSION = "2025-09-v2"
+
 # ---- Stronger, step-focused “system” rules ----
 SYSTEM_RULES = (
     "You are a careful dietician and chef. "
@@ -67,68 +89,6 @@ def build_prompt(ingredients: List[str], cuisine: Optional[str], cal_cap: Option
         f"Ingredients available: {ing_str}\n"
         f"{schema_hint}"
     )
-import re
-BAD_PHRASES = {"to taste", "cook to taste", "prep ingredients", "serve"}
-
-def _normalize_instructions(x) -> List[str]:
-    if isinstance(x, list):
-        parts = [str(p).strip() for p in x]
-    elif isinstance(x, str):
-        parts = re.split(r"(?:\n+|(?<=[.!?])\s+)", x.strip())
-    else:
-        parts = []
-    parts = [p for p in parts if p and len(p) >= 4]
-
-    if len(parts) < 5:
-        alt = []
-        for p in parts:
-            alt.extend([s.strip() for s in re.split(r";\s*", p) if s.strip()])
-        if len(alt) >= 5:
-            parts = alt
-
-    parts = parts[:12]
-
-    # add numbering if missing
-    numbered = []
-    for i, p in enumerate(parts, 1):
-        if re.match(r"^\d+[\.)]\s", p):
-            numbered.append(p)
-        else:
-            numbered.append(f"{i}. {p}")
-
-    if len(numbered) < 5:
-        while len(numbered) < 5:
-            numbered.append(f"{len(numbered)+1}. Finish cooking and plate.")
-        numbered = numbered[:12]
-    return numbered
-
-def _is_vague_step(s: str) -> bool:
-    s_low = s.lower()
-    if any(bp in s_low for bp in BAD_PHRASES):
-        return True
-    # Reject steps with no verbs or purely generic words
-    if not re.match(r"^\d+[\.)]\s*[A-Za-z]", s):
-        return True
-    # Encourage presence of time/heat words (min, sec, heat, °, medium, simmer)
-    if not re.search(r"\b(min|sec|seconds|minutes|medium|low|high|simmer|boil|°|degree|heat)\b", s_low):
-        # Not strictly an error, but helps filter very generic steps
-        # Treat as vague if the sentence is very short
-        return len(s) < 20
-    return False
-
-def _fix_instructions(steps: List[str]) -> List[str]:
-    steps = _normalize_instructions(steps)
-    cleaned = []
-    for s in steps:
-        if _is_vague_step(s):
-            # nudge with a default pattern if it’s too vague
-            s = re.sub(r"^\d+[\.)]\s*", "", s).strip()
-            if len(s) < 20:
-                s = "Add and cook on medium heat for 2–3 min."
-        cleaned.append(s)
-    # re-number
-    return [f"{i}. {re.sub(r'^\d+[\.)]\s*','',t)}" for i, t in enumerate(cleaned, 1)]
-
 
 
 def cuisine_matches(resp: Dict[str, Any], desired: str) -> bool:
@@ -141,126 +101,164 @@ def cuisine_matches(resp: Dict[str, Any], desired: str) -> bool:
     return desired_l in rcuisine or desired_l in title
 
 
-# ---- Instruction normalizer: ensures numbered 5–12 steps ----
-def _normalize_instructions(x) -> List[str]:
-    """
-    Accepts a list of strings and returns
-    a numbered 10–20 step list with concise, trimmed steps.
-    """
-    if isinstance(x, list):
-        parts = [str(p).strip() for p in x]
-    elif isinstance(x, str):
-        # split by newlines or sentence boundaries
-        parts = re.split(r"(?:\n+|(?<=[.!?])\s+)", x.strip())
-    else:
-        parts = []
-
-    # basic cleanup
-    parts = [p for p in parts if p and len(p) >= 4]
-
-    # If still too short, try splitting by semicolons
-    if len(parts) < 5:
-        alt = []
-        for p in parts:
-            alt.extend([s.strip() for s in re.split(r";\s*", p) if s.strip()])
-        if len(alt) >= 5:
-            parts = alt
-
-    # Limit to 12 steps max
-    parts = parts[:12]
-
-    # If still fewer than 5 steps, try to create reasonable splits
-    if len(parts) < 5 and len(parts) > 0:
-        # As a last resort, split long items by ' and ' or ', then '
-        expanded: List[str] = []
-        for p in parts:
-            chunks = re.split(r"\s+(?:and|then)\s+", p)
-            expanded.extend([c.strip() for c in chunks if c.strip()])
-        parts = [p for p in expanded if p][:12]
-
-    # Number them if not already
-    numbered: List[str] = []
-    for i, p in enumerate(parts, 1):
-        if re.match(r"^\d+[\.)]\s", p):
-            numbered.append(p)
-        else:
-            numbered.append(f"{i}. {p}")
-
-    # Ensure we have 5–12
-    if len(numbered) < 5:
-        # pad with generic safe end-steps if absolutely necessary
-        while len(numbered) < 5:
-            numbered.append(f"{len(numbered)+1}. Serve and enjoy.")
-        numbered = numbered[:12]
-
-    return numbered
+CUISINE_RETRY_HINT = (
+    "\nYou DID NOT follow the cuisine rule. Regenerate. "
+    "The 'cuisine' field MUST be exactly the requested cuisine, "
+    "and each 'title' MUST include that cuisine keyword."
+)
+
+
+def _as_recipes(data: Any) -> List[Dict[str, Any]]:
+    # Accept either a single-recipe dict or {"recipes":[...]}
+    if isinstance(data, dict) and "recipes" in data and isinstance(data["recipes"], list):
+        return data["recipes"]
+    if isinstance(data, dict):
+        return [data]
+    raise HTTPException(status_code=500, detail=f"Invalid LLM output: {data!r}")
+
+
+def _to_llm_recipe(r: Dict[str, Any], body: RecipeRequest) -> LlmRecipe:
+    """Map one raw model recipe -> normalized shape."""
+    title = str(r.get("title") or "Untitled Recipe").strip()
+    cuisine = str(r.get("cuisine") or (body.cuisine or "")).strip() or None
+    ingredients = [str(i).strip() for i in (r.get("ingredients") or [])]
+    instructions_raw = r.get("instructions") or []
+    instructions = fix_instructions(instructions_raw)
+
+    macros = r.get("macros") or {}
+    def n(x, default=0.0):
+        try: return float(x)
+        except Exception: return float(default)
+    macros = {
+        "calories": n(macros.get("calories"), 0),
+        "protein": n(macros.get("protein"), 0),
+        "carbs": n(macros.get("carbs"), 0),
+        "fat": n(macros.get("fat"), 0),
+    }
+
+    return LlmRecipe(
+        title=title,
+        cuisine=cuisine,
+        ingredients=ingredients,
+        instructions=instructions,
+        macros=macros,
+    )
+
+
+def _recipe_prompts(body: RecipeRequest) -> List[str]:
+    """One single-recipe prompt per requested recipe, so they can be generated in parallel."""
+    n = body.count
+    base = build_prompt(body.ingredients, body.cuisine, body.calorie_cap, 1)
+    if n == 1:
+        return [base]
+    return [
+        base + f"\nThis is recipe {i} of {n}; make it clearly different from the others "
+               "(distinct title, main technique and flavor profile)."
+        for i in range(1, n + 1)
+    ]
+
+
+async def _generate_recipe(prompt: str, cuisine: Optional[str]) -> Optional[Dict[str, Any]]:
+    recipes = _as_recipes(await llm.generate_json(prompt))
+    if not recipes:
+        return None
+    r = recipes[0]
+
+    # If cuisine strict and the recipe fails, try one retry
+    if cuisine and not cuisine_matches(r, cuisine):
+        data2 = await llm.generate_json(prompt + CUISINE_RETRY_HINT)
+        if isinstance(data2, dict):
+            retried = _as_recipes(data2)
+            if retried:
+                r = retried[0]
+        # else keep the original but stamp the cuisine field as fallback
+        if not cuisine_matches(r, cuisine):
+            r["cuisine"] = cuisine
+    return r
+
+
+def _cache_key(body: RecipeRequest, mode: str) -> str:
+    return generation_key(
+        body.ingredients, body.cuisine, body.calorie_cap, body.count,
+        model=llm.ollama_model, prompt_version=PROMPT_VERSION, mode=mode,
+    )
 
 
 @router.post("/llm_generate")
-def llm_generate(body: RecipeRequest):
+async def llm_generate(body: RecipeRequest):
     if not body.ingredients:
         raise HTTPException(status_code=400, detail="ingredients required")
 
-    # 1) Build prompt + call
-    prompt = build_prompt(body.ingredients, body.cuisine, body.calorie_cap, body.count)
-    data = llm.generate_json(prompt)
+    key = _cache_key(body, "fanout")
+    cached = await generation_cache.aget(key)
+    if cached is not None:
+        return {"recipes": cached}
 
-    # Accept either a single-recipe dict or {"recipes":[...]}
-    recipes: List[Dict[str, Any]] = []
-    if isinstance(data, dict) and "recipes" in data and isinstance(data["recipes"], list):
-        recipes = data["recipes"]
-    elif isinstance(data, dict):
-        recipes = [data]
-    else:
-        raise HTTPException(status_code=500, detail=f"Invalid LLM output: {data!r}")
-
-    # If cuisine strict and some items fail, try one retry
-    if body.cuisine and not all(cuisine_matches(r, body.cuisine) for r in recipes):
-        retry_prompt = (
-            build_prompt(body.ingredients, body.cuisine, body.calorie_cap, body.count)
-            + "\nYou DID NOT follow the cuisine rule. Regenerate. "
-              "The 'cuisine' field MUST be exactly the requested cuisine, "
-              "and each 'title' MUST include that cuisine keyword."
-        )
-        data2 = llm.generate_json(retry_prompt)
-        if isinstance(data2, dict) and "recipes" in data2 and isinstance(data2["recipes"], list):
-            recipes = data2["recipes"]
-        elif isinstance(data2, dict):
-            recipes = [data2]
-        # else keep originals but we will stamp cuisine field as fallback
-        for r in recipes:
-            if not cuisine_matches(r, body.cuisine):
-                r["cuisine"] = body.cuisine
-
-    # Map -> normalized shape
-    out: List[LlmRecipe] = []
-    for r in recipes[: max(1, body.count)]:
-        title = str(r.get("title") or "Untitled Recipe").strip()
-        cuisine = str(r.get("cuisine") or (body.cuisine or "")).strip() or None
-        ingredients = [str(i).strip() for i in (r.get("ingredients") or [])]
-        instructions_raw = r.get("instructions") or []
-        instructions = _fix_instructions(instructions_raw)
-
-        macros = r.get("macros") or {}
-        def n(x, default=0.0):
-            try: return float(x)
-            except Exception: return float(default)
-        macros = {
-            "calories": n(macros.get("calories"), 0),
-            "protein": n(macros.get("protein"), 0),
-            "carbs": n(macros.get("carbs"), 0),
-            "fat": n(macros.get("fat"), 0),
-        }
-
-        out.append(LlmRecipe(
-            title=title,
-            cuisine=cuisine,
-            ingredients=ingredients,
-            instructions=instructions,
-            macros=macros,
-        ))
-
-    # For backward compat you were returning one LlmRecipe earlier;
-    # but your latest curl showed {"recipes":[...]}.
-    # We’ll return the array to match your latest behavior.
-    return {"recipes": [o.model_dump() for o in out]}
+    # 1) One model call per recipe, run concurrently (bounded by the provider)
+    generated = await asyncio.gather(
+        *(_generate_recipe(p, body.cuisine) for p in _recipe_prompts(body))
+    )
+
+    # 2) Map -> normalized shape
+    out = [_to_llm_recipe(r, body).model_dump() for r in generated if r is not None]
+    if len(out) == body.count:
+        await generation_cache.aset(key, out)
+    return {"recipes": out}
+
+
+@router.get("/llm_cache/stats")
+def llm_cache_stats():
+    return {**generation_cache.stats(), "model_calls": llm.flight_stats()}
+
+
+@router.post("/llm_generate/stream")
+async def llm_generate_stream(body: RecipeRequest):
+    """
+    Streaming variant of /llm_generate. Responds with NDJSON: one
+    {"recipe": {...}} line per recipe as soon as the model closes its JSON
+    object (already normalized), then a final {"done": true, "count": n}.
+    A failure mid-stream is reported as an {"error": "..."} line. Complete
+    results are cached apart from /llm_generate's, since they come from one
+    call rather than one per recipe.
+    """
+    if not body.ingredients:
+        raise HTTPException(status_code=400, detail="ingredients required")
+
+    n = body.count
+    prompt = build_prompt(body.ingredients, body.cuisine, body.calorie_cap, n)
+    key = _cache_key(body, "stream")
+
+    async def lines() -> AsyncIterator[str]:
+        cached = await generation_cache.aget(key)
+        if cached is not None:
+            for recipe in cached:
+                yield json.dumps({"recipe": recipe}) + "\n"
+            yield json.dumps({"done": True, "count": len(cached), "cached": True}) + "\n"
+            return
+
+        parser = RecipeStreamParser()
+        sent: List[Dict[str, Any]] = []
+        pieces = llm.stream_text(prompt)
+        try:
+            async for piece in pieces:
+                for r in parser.feed(piece):
+                    if body.cuisine and not cuisine_matches(r, body.cuisine):
+                        r["cuisine"] = body.cuisine
+                    recipe = _to_llm_recipe(r, body).model_dump()
+                    yield json.dumps({"recipe": recipe}) + "\n"
+                    sent.append(recipe)
+                    if len(sent) >= n:
+                        break
+                if len(sent) >= n or parser.done:
+                    break
+        except HTTPException as e:
+            yield json.dumps({"error": e.detail}) + "\n"
+            return
+        finally:
+            await pieces.aclose()  # release the upstream connection when we stop early
+        # a stream that ended early is served as is, but not cached
+        if len(sent) == n:
+            await generation_cache.aset(key, sent)
+        yield json.dumps({"done": True, "count": len(sent)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
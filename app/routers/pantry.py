@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import SessionLocal
+from typing import List, Optional
+from app.core.owner import get_owner_id
+from app.db.database import AsyncSessionLocal, SessionLocal
 from app.db.models import PantryItem
-from app.schemas.pantry import PantryCreate, PantryOut
+from app.schemas.pantry import PantryBatch, PantryBatchOut, PantryCreate, PantryOut
+from app.services.bulk_io import MEDIA_TYPES, export_stream, import_stream
+from app.services.listing import keyset_page, page_response, projection_model, select_fields
+from app.services.pantry import UnknownPantryItems, apply_batch, expiring_query, pantry_cache
 
 router = APIRouter(prefix="/pantry", tags=["pantry"])
 
@@ -14,13 +20,35 @@ def get_db():
     finally:
         db.close()
 
-@router.get("/list", response_model=List[PantryOut])
-def list_items(db: Session = Depends(get_db)):
-    return db.query(PantryItem).order_by(PantryItem.id.desc()).all()
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+PANTRY_FIELDS = tuple(PantryOut.model_fields)
+PantryFields = projection_model(PantryOut)
+
+@router.get("/list", response_model=List[PantryFields])
+async def list_items(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="comma-separated columns, e.g. 'name,expiry_date' (id is always included)"),
+    owner_id: str = Depends(get_owner_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """The owner's items, newest first, one page at a time (see app.services.listing)."""
+    try:
+        columns = select_fields(fields, PANTRY_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page = await keyset_page(
+        db, PantryItem, columns, limit, cursor, descending=True, where=[PantryItem.owner_id == owner_id]
+    )
+    return page_response(page)
 
 @router.post("/add", response_model=PantryOut)
-def add_item(payload: PantryCreate, db: Session = Depends(get_db)):
+def add_item(payload: PantryCreate, owner_id: str = Depends(get_owner_id), db: Session = Depends(get_db)):
     item = PantryItem(
+        owner_id=owner_id,
         name=payload.name,
         quantity=payload.quantity,
         unit=payload.unit,
@@ -29,4 +57,57 @@ def add_item(payload: PantryCreate, db: Session = Depends(get_db)):
     db.add(item)
     db.commit()
     db.refresh(item)
+    pantry_cache.invalidate(owner_id)
     return item
+
+@router.post("/batch", response_model=PantryBatchOut)
+def batch_items(payload: PantryBatch, owner_id: str = Depends(get_owner_id), db: Session = Depends(get_db)):
+    """
+    Add, update and delete items in one transaction; all of it applies or
+    none does. Adds with the same normalized name as an existing item (or
+    each other) merge into it (see app.services.pantry).
+    """
+    try:
+        return apply_batch(db, owner_id, payload.add, payload.update, payload.delete)
+    except UnknownPantryItems as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/expiring", response_model=List[PantryOut])
+async def expiring_items(
+    days: int = Query(3, ge=0, le=365),
+    include_expired: bool = Query(False, description="also list items already past their expiry date"),
+    owner_id: str = Depends(get_owner_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Items expiring within `days` days, soonest first (an index range scan on (owner_id, expiry_date))."""
+    return (await db.execute(expiring_query(owner_id, days, include_expired=include_expired))).scalars().all()
+
+@router.post("/import")
+async def import_items(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(1000, ge=1, le=10000),
+    owner_id: str = Depends(get_owner_id),
+):
+    """Add pantry items from an NDJSON or CSV request body (PantryCreate fields), read as it streams in."""
+    stats = await import_stream("pantry", request.stream(), format, chunk_size, owner_id=owner_id)
+    return stats.as_dict()
+
+@router.get("/export")
+async def export_items(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = Query(None, description="comma-separated columns, as for /pantry/list"),
+    owner_id: str = Depends(get_owner_id),
+):
+    """Every item in the owner's pantry, streamed in id order."""
+    try:
+        columns = select_fields(fields, PANTRY_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        export_stream(PantryItem, columns, format, where=[PantryItem.owner_id == owner_id]),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="pantry.{format}"'},
+    )
@@ -1,43 +1,105 @@
 # apps/api/app/routers/plan.py
-from fastapi import APIRouter, Query
-from typing import Dict, Any, List
+from typing import Any, Dict, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.core.owner import get_owner_id
+from app.db.database import SessionLocal
+from app.services.pantry import pantry_names
+from app.services.planner import DayPlan, pantry_fit_column, plan_day as solve_day, plan_week as solve_week
+from app.services.recipe_index import RecipeColumns, recipe_index
 
 router = APIRouter(tags=["planner"])
 
-# Minimal local fallback so we don't depend on recipe.py internals.
-# You can swap this later for your real nutrition service.
-def _macros_for(ingredients_text: str) -> Dict[str, float]:
-    text = (ingredients_text or "").lower()
-    cal = 0.0; p = 0.0; c = 0.0; f = 0.0
-
-    # very rough heuristics just to keep the endpoint alive
-    if "egg" in text:
-        cal += 155; p += 13; c += 1.1; f += 11
-    if "rice" in text:
-        cal += 130; p += 2.7; c += 28; f += 0.3
-    if "tomato" in text:
-        cal += 18; p += 0.9; c += 3.9; f += 0.2
-    if "milk" in text:
-        cal += 60; p += 3.2; c += 5; f += 3.3
 
+# ---------- DB session dependency ----------
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ---------- Helpers ----------
+def _pantry_fit(db: Session, owner_id: str, cols: RecipeColumns) -> np.ndarray:
+    pantry = pantry_names(db, owner_id)
+    have = np.zeros(len(cols))
+    for rid, n in recipe_index.overlap_counts(pantry).items():
+        row = cols.rows.get(rid)
+        if row is not None:
+            have[row] = n
+    return pantry_fit_column(cols, have)
+
+
+def _day(cols: RecipeColumns, fit: np.ndarray, plan: Optional[DayPlan], protein_target: int, calorie_cap: int) -> Dict[str, Any]:
+    meals = []
+    totals = {"calories": 0, "protein": 0, "carbs": 0, "fat": 0}
+    for row in plan.rows if plan else ():
+        r = cols.entries[row]
+        meals.append(
+            {
+                "id": r.id,
+                "title": r.title,
+                "ingredients": r.ingredients,
+                "time_minutes": r.time_minutes,
+                "macros": r.macros,
+                "pantry_fit": float(fit[row]),
+            }
+        )
+        for k in totals:
+            totals[k] += r.macros[k]
     return {
-        "calories": round(cal, 1),
-        "protein": round(p, 1),
-        "carbs": round(c, 1),
-        "fat": round(f, 1),
+        "meals": meals,
+        "totals": totals,
+        "met": {"protein": totals["protein"] >= protein_target, "calories": totals["calories"] <= calorie_cap},
     }
 
+
+# ---------- Planner ----------
 @router.get("/plan/day")
 def plan_day(
     protein_target: int = Query(120, ge=10, le=300),
     calorie_cap: int = Query(1800, ge=500, le=4000),
+    meals: int = Query(3, ge=1, le=6),
+    owner_id: str = Depends(get_owner_id),
+    db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
-    Very simple placeholder planner that returns an empty meal list
-    but keeps the API contract alive. Replace with your deterministic
-    planner when ready.
+    Pick `meals` distinct recipes that reach protein_target within calorie_cap,
+    preferring recipes that use the owner's pantry (see app.services.planner).
     """
+    recipe_index.ensure_built(db)
+    cols = recipe_index.columns()
+    fit = _pantry_fit(db, owner_id, cols)
+    plan = solve_day(cols, fit, meals, protein_target, calorie_cap)
+    return {
+        "targets": {"protein_target": protein_target, "calorie_cap": calorie_cap, "meals": meals},
+        **_day(cols, fit, plan, protein_target, calorie_cap),
+    }
+
+
+@router.get("/plan/week")
+def plan_week(
+    protein_target: int = Query(120, ge=10, le=300),
+    calorie_cap: int = Query(1800, ge=500, le=4000),
+    meals: int = Query(3, ge=1, le=6),
+    days: int = Query(7, ge=1, le=14),
+    owner_id: str = Depends(get_owner_id),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """Daily plans as /plan/day, with no recipe repeated until the catalog runs out."""
+    recipe_index.ensure_built(db)
+    cols = recipe_index.columns()
+    fit = _pantry_fit(db, owner_id, cols)
+    plans = solve_week(cols, fit, days, meals, protein_target, calorie_cap)
+    out = [{"day": i + 1, **_day(cols, fit, p, protein_target, calorie_cap)} for i, p in enumerate(plans)]
+    totals = {k: sum(d["totals"][k] for d in out) for k in ("calories", "protein", "carbs", "fat")}
     return {
-        "meals": [],
-        "totals": {"calories": calorie_cap, "protein": protein_target, "carbs": 0, "fat": 0},
+        "targets": {"protein_target": protein_target, "calorie_cap": calorie_cap, "meals": meals, "days": days},
+        "days": out,
+        "totals": totals,
+        "average": {k: round(v / days, 1) for k, v in totals.items()},
     }
@@ -1,17 +1,36 @@
 # apps/api/app/routers/recipe.py
 from __future__ import annotations
 
-import re
-from typing import List, Set, Dict
-
-from fastapi import APIRouter, Depends, Query
+from datetime import date, datetime, timezone
+from itertools import islice
+from typing import List, Dict, FrozenSet, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.database import SessionLocal
-from app.db.models import Recipe, PantryItem
+from app.core.owner import get_owner_id
+from app.db.database import AsyncSessionLocal, SessionLocal
+from app.db.models import Recipe, SavedRecipe
 from app.schemas.recipe import RecipeCreate, RecipeOut
-from app.services.ranker import nutrition_fit, time_fit, final_score
-from app.services.nutrition import estimate_macros_from_string
+from app.services.ranker import (
+    bounded_top_k,
+    expiring_boost_batch,
+    final_score_batch,
+    ingredient_fit_batch,
+    round_batch,
+    time_fit_batch,
+)
+from app.services.bulk_io import MEDIA_TYPES, export_stream, import_stream
+from app.services.ingredients import recipe_ids_with_all, sync_recipe_ingredients
+from app.services.listing import keyset_page, page_response, projection_model, select_fields
+from app.services.macro_jobs import get_job, job_status, start_job, submit
+from app.services.pantry import expiring_names_query, pantry_state_async
+from app.services.recipe_index import recipe_index, RecipeColumns
+from app.services.response_cache import cached_json, response_cache
 
 router = APIRouter(prefix="/recipes", tags=["recipes"])
 
@@ -25,49 +44,44 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 # ---------- Helpers ----------
-def _parse_ingredients(raw: str) -> Set[str]:
-    """MVP parser: split comma-separated ingredients to a lowercase set."""
-    if not raw:
-        return set()
-    return {part.strip().lower() for part in raw.split(",") if part.strip()}
+async def _ensure_index(db: AsyncSession) -> None:
+    # built at startup; this only runs if that was skipped (e.g. a test app)
+    if not recipe_index.built:
+        await db.run_sync(recipe_index.ensure_built)
 
 
-def _tokens(s: str) -> Set[str]:
-    return set(re.findall(r"[a-zA-Z]+", (s or "").lower()))
+def _cache_key(endpoint: str, params: tuple, owner_id: str, pantry_version: int) -> tuple:
+    """Result cache key: the request plus the versions of the data it ranks (see app.services.response_cache)."""
+    return (endpoint, params, owner_id, recipe_index.version, pantry_version)
 
 
-def _query_match_score(q: str, title: str, ingredients: str) -> float:
-    """Very light text relevance: overlap between query tokens and title+ingredient tokens."""
-    if not q:
-        return 0.0
-    qset = _tokens(q)
-    tset = _tokens(title) | _tokens(ingredients)
-    if not qset or not tset:
-        return 0.0
-    overlap = len(qset & tset)
-    return round(overlap / max(1, len(qset)), 3)
+def _have_column(cols: RecipeColumns, overlap: Dict[int, int]) -> np.ndarray:
+    """Scatter {recipe_id: pantry overlap} into a dense per-row array (zeros elsewhere)."""
+    have = np.zeros(len(cols))
+    for rid, n in overlap.items():
+        row = cols.rows.get(rid)
+        if row is not None:
+            have[row] = n
+    return have
 
 
-def _macros_for(r: Recipe) -> Dict[str, int]:
-    """
-    Use DB macros if present, otherwise compute from ingredient string (fallback).
-    Returns dict with calories, protein, carbs, fat (ints).
-    """
-    if None in (r.calories, r.protein, r.carbs, r.fat):
-        est = estimate_macros_from_string(r.ingredients or "")
-        return {
-            "calories": est["calories"],
-            "protein": est["protein"],
-            "carbs": est["carbs"],
-            "fat": est["fat"],
-        }
-    return {
-        "calories": int(r.calories or 0),
-        "protein": int(r.protein or 0),
-        "carbs": int(r.carbs or 0),
-        "fat": int(r.fat or 0),
-    }
+def _query_column(cols: RecipeColumns, q: str) -> np.ndarray:
+    """BM25 relevance of q per row, scaled so the best match is 1.0 (zeros elsewhere)."""
+    q_fit = np.zeros(len(cols))
+    bm25 = recipe_index.text_scores(q) if q else {}
+    if bm25:
+        top = max(bm25.values())
+        for rid, s in bm25.items():
+            row = cols.rows.get(rid)
+            if row is not None:
+                q_fit[row] = round(s / top, 3)
+    return q_fit
 
 
 # ---------- CRUD ----------
@@ -75,113 +89,292 @@ def _macros_for(r: Recipe) -> Dict[str, int]:
 def add_recipe(payload: RecipeCreate, db: Session = Depends(get_db)):
     recipe = Recipe(**payload.dict())
     db.add(recipe)
+    db.flush()
+    sync_recipe_ingredients(db, [recipe])
     db.commit()
     db.refresh(recipe)
+    recipe_index.upsert(recipe)
     return recipe
 
 
-@router.get("/list", response_model=List[RecipeOut])
-def list_recipes(db: Session = Depends(get_db)):
-    return db.query(Recipe).all()
+RECIPE_FIELDS = tuple(RecipeOut.model_fields)
+RecipeFields = projection_model(RecipeOut)
+
+
+@router.get("/list", response_model=List[RecipeFields])
+async def list_recipes(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor header of the previous page"),
+    fields: Optional[str] = Query(None, description="comma-separated columns, e.g. 'title,calories' (id is always included)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Recipes by id, one page at a time (see app.services.listing)."""
+    try:
+        columns = select_fields(fields, RECIPE_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page_response(await keyset_page(db, Recipe, columns, limit, cursor))
+
+
+# ---------- Saved recipes (per owner) ----------
+@router.get("/saved", response_model=List[RecipeOut])
+async def saved_recipes(owner_id: str = Depends(get_owner_id), db: AsyncSession = Depends(get_async_db)):
+    """The owner's saved recipes, most recently saved first."""
+    stmt = (
+        select(Recipe)
+        .join(SavedRecipe, SavedRecipe.recipe_id == Recipe.id)
+        .where(SavedRecipe.owner_id == owner_id)
+        .order_by(SavedRecipe.created_at.desc(), Recipe.id)
+    )
+    return (await db.execute(stmt)).scalars().all()
+
+
+@router.put("/{recipe_id}/saved", status_code=204)
+def save_recipe(recipe_id: int, owner_id: str = Depends(get_owner_id), db: Session = Depends(get_db)):
+    if db.get(Recipe, recipe_id) is None:
+        raise HTTPException(status_code=404, detail="recipe not found")
+    if db.get(SavedRecipe, (owner_id, recipe_id)) is None:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        db.add(SavedRecipe(owner_id=owner_id, recipe_id=recipe_id, created_at=now))
+        db.commit()
+    return Response(status_code=204)
+
+
+@router.delete("/{recipe_id}/saved", status_code=204)
+def unsave_recipe(recipe_id: int, owner_id: str = Depends(get_owner_id), db: Session = Depends(get_db)):
+    db.query(SavedRecipe).filter(SavedRecipe.owner_id == owner_id, SavedRecipe.recipe_id == recipe_id).delete()
+    db.commit()
+    return Response(status_code=204)
+
+
+# ---------- Bulk import / export ----------
+@router.post("/import")
+async def import_recipes(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Add recipes from an NDJSON or CSV request body (RecipeCreate fields), read
+    as it streams in. Titles already in the catalog, or repeated in the body,
+    are skipped (see app.services.bulk_io).
+    """
+    stats = await import_stream("recipes", request.stream(), format, chunk_size)
+    return stats.as_dict()
+
+
+@router.get("/export")
+async def export_recipes(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = Query(None, description="comma-separated columns, as for /recipes/list"),
+):
+    """Every recipe, streamed in id order."""
+    try:
+        columns = select_fields(fields, RECIPE_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        export_stream(Recipe, columns, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="recipes.{format}"'},
+    )
 
 
 # ---------- Smart Suggest (ingredients + time + nutrition) ----------
 @router.get("/suggest")
-def suggest_recipes(
+async def suggest_recipes(
     max_time: int = Query(20, ge=5, le=240),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
+    expiring_within: Optional[int] = Query(
+        None, ge=0, le=30, description="boost recipes using pantry items that expire within this many days"
+    ),
+    owner_id: str = Depends(get_owner_id),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    pantry = {p.name.lower() for p in db.query(PantryItem).all()}
-
-    rows = db.query(Recipe).all()
+    await _ensure_index(db)
+    # the expiry window moves with the date
+    today = date.today().isoformat() if expiring_within is not None else None
+    pantry, pantry_version = await pantry_state_async(db, owner_id)
+    key = _cache_key("suggest", (max_time, limit, expiring_within, today), owner_id, pantry_version)
+    return await cached_json(
+        key, if_none_match, lambda: _suggest(db, owner_id, pantry, max_time, limit, expiring_within)
+    )
+
+
+async def _suggest(
+    db: AsyncSession, owner_id: str, pantry: FrozenSet[str], max_time: int, limit: int, expiring_within: Optional[int]
+) -> dict:
+    expiring = set()
+    if expiring_within is not None:
+        expiring = set((await db.execute(expiring_names_query(owner_id, expiring_within))).scalars())
+    cols = recipe_index.columns()
+    have = _have_column(cols, recipe_index.overlap_counts(pantry))
+    exp = _have_column(cols, recipe_index.overlap_counts(expiring))
+
+    def fits(rows: np.ndarray):
+        ing = ingredient_fit_batch(have[rows], cols.n_ingredients[rows])
+        t = time_fit_batch(cols.time_minutes[rows], max_time)
+        nut = cols.nutrition[rows]
+        score = final_score_batch(ing, t, nut)
+        if expiring:
+            score = round_batch(score + expiring_boost_batch(exp[rows], cols.n_ingredients[rows]), 4)
+        return score, ing, t, nut
+
+    # Recipes using pantry items are scored exactly; the rest (no ingredient
+    # or expiry term) are visited best-nutrition-first and cut off by the 0.2 + 0.3*nut bound.
+    exact = np.flatnonzero((have > 0) | (exp > 0))
+    order = cols.by_nutrition
+    rest = order[(have[order] == 0) & (exp[order] == 0) & (cols.n_ingredients[order] > 0)]
+    winners = np.array(
+        bounded_top_k(
+            limit, exact, fits(exact)[0],
+            rest, round_batch(0.2 + 0.3 * cols.nutrition[rest], 4),
+            lambda rows: fits(rows)[0],
+        ),
+        dtype=np.intp,
+    )
+
+    score, ing, t_fit, n_fit = fits(winners)
     scored = []
-    for r in rows:
-        ings = _parse_ingredients(r.ingredients)
-        if not ings:
-            continue
-        have = len(ings & pantry)
-        ing_score = round(have / len(ings), 3)
-
-        macros = _macros_for(r)
-        t_score = time_fit(r.time_minutes or 15, max_time)
-        n_score = nutrition_fit({"protein": macros["protein"], "calories": macros["calories"]})
-
-        s = final_score(ing_score, t_score, n_score)
-        scored.append(
-            {
-                "id": r.id,
-                "title": r.title,
-                "ingredients": r.ingredients,
-                "time_minutes": r.time_minutes,
-                "macros": macros,
-                "fit": {"ingredients": ing_score, "time": t_score, "nutrition": n_score},
-                "score": s,
-                "explanation": f"Uses {have}/{len(ings)} pantry items · {r.time_minutes or 15} min · {macros['protein']}g protein",
-            }
-        )
+    for i, row in enumerate(winners):
+        r = cols.entries[row]
+        macros = r.macros
+        item = {
+            "id": r.id,
+            "title": r.title,
+            "ingredients": r.ingredients,
+            "time_minutes": r.time_minutes,
+            "macros": macros,
+            "fit": {"ingredients": float(ing[i]), "time": float(t_fit[i]), "nutrition": float(n_fit[i])},
+            "score": float(score[i]),
+            "explanation": f"Uses {int(have[row])}/{len(r.ingredient_set)} pantry items · {r.time_minutes or 15} min · {macros['protein']}g protein",
+        }
+        if expiring_within is not None:
+            item["fit"]["expiring"] = float(expiring_boost_batch(exp[[row]], cols.n_ingredients[[row]])[0])
+            if exp[row]:
+                item["explanation"] += f" · uses {int(exp[row])} expiring soon"
+        scored.append(item)
 
-    scored.sort(key=lambda x: x["score"], reverse=True)
-    return {"results": scored[:limit], "pantry": sorted(list(pantry)), "max_time": max_time}
+    out = {"results": scored, "pantry": sorted(list(pantry)), "max_time": max_time}
+    if expiring_within is not None:
+        out["expiring"] = sorted(expiring)
+    return out
 
 
 # ---------- Text Search (query + filters + ranking) ----------
 @router.get("/search")
-def search_recipes(
+async def search_recipes(
     q: str = Query("", description="search text, e.g. 'high protein egg'"),
     max_time: int = Query(30, ge=5, le=240),
     min_protein: int = Query(0, ge=0, le=200),
     max_calories: int = Query(10000, ge=1, le=20000),
+    ingredients: List[str] = Query([], description="only recipes using all of these, e.g. ?ingredients=egg&ingredients=rice"),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
+    owner_id: str = Depends(get_owner_id),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    pantry = {p.name.lower() for p in db.query(PantryItem).all()}
-    rows = db.query(Recipe).all()
-
+    await _ensure_index(db)
+    # ingredient order, case and repeats don't change the result (an all-blank list still filters everything out)
+    wanted = tuple(sorted({i.strip().lower() for i in ingredients if i.strip()}))
+    pantry, pantry_version = await pantry_state_async(db, owner_id)
+    key = _cache_key(
+        "search", (q, max_time, min_protein, max_calories, bool(ingredients), wanted, limit), owner_id, pantry_version
+    )
+    return await cached_json(
+        key, if_none_match,
+        lambda: _search(db, pantry, q, max_time, min_protein, max_calories, ingredients, limit),
+    )
+
+
+async def _search(
+    db: AsyncSession,
+    pantry: FrozenSet[str],
+    q: str,
+    max_time: int,
+    min_protein: int,
+    max_calories: int,
+    ingredients: List[str],
+    limit: int,
+) -> dict:
+    cols = recipe_index.columns()
+    have = _have_column(cols, recipe_index.overlap_counts(pantry))
+
+    # basic filters
+    keep = (cols.protein >= min_protein) & (cols.calories <= max_calories)
+    if ingredients:
+        # membership is answered by the recipe_ingredients index, not by scanning rows
+        required = np.zeros(len(cols), dtype=bool)
+        for rid in await db.run_sync(recipe_ids_with_all, ingredients):
+            row = cols.rows.get(rid)
+            if row is not None:
+                required[row] = True
+        keep &= required
+    candidates = np.flatnonzero(keep)
+    q_fit = _query_column(cols, q)
+
+    def fits(rows: np.ndarray):
+        ing = ingredient_fit_batch(have[rows], cols.n_ingredients[rows])
+        t = time_fit_batch(cols.time_minutes[rows], max_time)
+        nut = cols.nutrition[rows]
+        base = final_score_batch(ing, t, nut)
+        return round_batch(0.85 * base + 0.15 * q_fit[rows], 4), ing, t, nut
+
+    # Pantry or query matches are scored exactly; everything else is bounded
+    # by 0.85 * (0.2 + 0.3*nut) and visited best-nutrition-first.
+    matched = (have > 0) | (q_fit > 0)
+    exact = candidates[matched[candidates]]
+    order = cols.by_nutrition
+    in_filters = np.zeros(len(cols), dtype=bool)
+    in_filters[candidates] = True
+    rest = order[in_filters[order] & ~matched[order]]
+    winners = np.array(
+        bounded_top_k(
+            limit, exact, fits(exact)[0],
+            rest, round_batch(0.85 * round_batch(0.2 + 0.3 * cols.nutrition[rest], 4), 4),
+            lambda rows: fits(rows)[0],
+        ),
+        dtype=np.intp,
+    )
+
+    total, ing, t_fit, n_fit = fits(winners)
     results = []
-    for r in rows:
-        macros = _macros_for(r)
-
-        # basic filters
-        if macros["protein"] < min_protein:
-            continue
-        if macros["calories"] > max_calories:
-            continue
-
-        ings = _parse_ingredients(r.ingredients)
-        have = len(ings & pantry)
-        ing_score = round(have / len(ings), 3) if ings else 0.0
-        t_score = time_fit(r.time_minutes or 15, max_time)
-        n_score = nutrition_fit({"protein": macros["protein"], "calories": macros["calories"]})
-        base_score = final_score(ing_score, t_score, n_score)
-
-        q_score = _query_match_score(q, r.title or "", r.ingredients or "")
-        total = round(0.85 * base_score + 0.15 * q_score, 4)
-
+    for i, row in enumerate(winners):
+        r = cols.entries[row]
+        ing_score, t_score, n_score, q_score = float(ing[i]), float(t_fit[i]), float(n_fit[i]), float(q_fit[row])
         results.append(
             {
                 "id": r.id,
                 "title": r.title,
                 "ingredients": r.ingredients,
                 "time_minutes": r.time_minutes,
-                "macros": macros,
+                "macros": r.macros,
                 "fit": {"ingredients": ing_score, "time": t_score, "nutrition": n_score, "query": q_score},
-                "score": total,
+                "score": float(total[i]),
                 "explanation": f"q:{q_score} · ing:{ing_score} · time:{t_score} · nut:{n_score}",
             }
         )
 
-    results.sort(key=lambda x: x["score"], reverse=True)
     return {
         "query": q,
-        "filters": {"max_time": max_time, "min_protein": min_protein, "max_calories": max_calories},
+        "filters": {
+            "max_time": max_time,
+            "min_protein": min_protein,
+            "max_calories": max_calories,
+            "ingredients": sorted({i.strip().lower() for i in ingredients if i.strip()}),
+        },
         "pantry": sorted(list(pantry)),
-        "results": results[:limit],
+        "results": results,
     }
+
+
+@router.get("/response_cache/stats")
+def response_cache_stats():
+    return response_cache.stats()
 from typing import List
 from fastapi import Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 
 from app.db.database import SessionLocal
 from app.db.models import Recipe  # adjust if your Recipe model lives elsewhere
@@ -200,23 +393,21 @@ def search_recipes(
     limit: int = 10,
     db: Session = Depends(get_db),
 ):
-    qs = db.query(Recipe)
+    recipe_index.ensure_built(db)
     if q:
-        like = f"%{q}%"
-        qs = qs.filter(or_(Recipe.title.ilike(like), Recipe.ingredients.ilike(like)))
-    if max_time:
-        qs = qs.filter((Recipe.time_minutes == None) | (Recipe.time_minutes <= max_time))  # noqa
-
-    rows: List[Recipe] = qs.limit(limit).all()
+        bm25 = recipe_index.text_scores(q)
+        entries = (recipe_index.get(rid) for rid in sorted(bm25, key=lambda rid: (-bm25[rid], rid)))
+    else:
+        entries = recipe_index.entries()
+    # stop at limit rows; an empty q would otherwise filter the whole catalog
+    rows = list(islice(
+        (r for r in entries if r is not None and (not max_time or r.time_minutes is None or r.time_minutes <= max_time)),
+        limit,
+    ))
 
     results = []
     for r in rows:
-        macros = {
-            "calories": r.calories or 0,
-            "protein": r.protein or 0,
-            "carbs": r.carbs or 0,
-            "fat": r.fat or 0,
-        }
+        macros = r.macros
         results.append({
             "id": r.id,
             "title": r.title,
@@ -234,28 +425,29 @@ def search_recipes(
 
 
 
-# ---------- Maintenance: recompute & persist macros for missing ones ----------
+# ---------- Maintenance: recompute & persist estimated macros (batched job) ----------
 @router.post("/recompute_macros")
-def recompute_macros(db: Session = Depends(get_db)):
+def recompute_macros(
+    full: bool = Query(False, description="recompute every recipe, including hand-entered macros"),
+    wait: bool = Query(False, description="run to completion before responding (if this process runs the job)"),
+    db: Session = Depends(get_db),
+):
     """
-    For any recipe missing macros, estimate from ingredients (string-based MVP),
-    save back to DB, and return a summary.
+    Start a job that estimates macros for recipes that are missing them or
+    were estimated under an older nutrition table. By default it runs in the
+    background; poll GET /recipes/recompute_macros/{job_id} for progress.
     """
-    rows = db.query(Recipe).all()
-    updated = 0
-    items = []
-    for r in rows:
-        if None in (r.calories, r.protein, r.carbs, r.fat):
-            est = estimate_macros_from_string(r.ingredients or "")
-            if sum(est.values()) == 0:
-                continue
-            r.calories = est["calories"]
-            r.protein = est["protein"]
-            r.carbs = est["carbs"]
-            r.fat = est["fat"]
-            db.add(r)
-            db.commit()
-            db.refresh(r)
-            updated += 1
-            items.append({"id": r.id, "title": r.title, "macros": est})
-    return {"updated": updated, "items": items}
+    job = start_job(db, full=full)
+    thread = submit(job.id)
+    if wait:
+        thread.join()
+        db.refresh(job)
+    return job_status(job)
+
+
+@router.get("/recompute_macros/{job_id}")
+def recompute_macros_progress(job_id: int, db: Session = Depends(get_db)):
+    job = get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job_status(job)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 
 class PantryCreate(BaseModel):
     name: str
@@ -17,3 +17,21 @@ class PantryOut(BaseModel):
 
     class Config:
         from_attributes = True  # Pydantic v2: map from SQLAlchemy model
+
+class PantryUpdate(BaseModel):
+    id: int
+    name: Optional[str] = None
+    quantity: Optional[int] = None
+    unit: Optional[str] = None
+    expiry_date: Optional[date] = None  # only fields that are sent are changed; null clears the date
+
+class PantryBatch(BaseModel):
+    add: List[PantryCreate] = []
+    update: List[PantryUpdate] = []
+    delete: List[int] = []
+
+class PantryBatchOut(BaseModel):
+    added: List[PantryOut]
+    merged: List[PantryOut]  # existing items whose quantity absorbed an add
+    updated: List[PantryOut]
+    deleted: List[int]
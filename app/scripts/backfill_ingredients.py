@@ -0,0 +1,26 @@
+# app/scripts/backfill_ingredients.py
+"""
+Fill the ingredients / recipe_ingredients tables from Recipe.ingredients text.
+
+    python -m app.scripts.backfill_ingredients
+
+Creates the tables if needed and only touches recipes that have no rows
+yet, so it is safe to re-run. The API runs the same backfill at startup.
+"""
+from app.db.database import SessionLocal, engine
+from app.db.models import Base
+from app.services.ingredients import backfill_recipe_ingredients
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        n = backfill_recipe_ingredients(db)
+    finally:
+        db.close()
+    print(f"Backfilled ingredients for {n} recipes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# app/scripts/bench_bulk_io.py
+"""
+Rows/s of bulk recipe import/export vs the per-row seeding path.
+
+    python -m app.scripts.bench_bulk_io [n_rows]
+
+Runs against a throwaway SQLite database (DATABASE_URL is pointed at a temp
+file before the app is imported) with the recipe index built, as in the
+API. Reports rows/s for:
+  - seed_basic.upsert_recipe, one query + commit per row (first 2k rows),
+  - import_blocks from NDJSON and from CSV into an empty catalog,
+  - re-importing the same NDJSON (every row a duplicate),
+  - export_stream to NDJSON and CSV.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+os.environ["MACRO_MATRIX_PATH"] = ""
+
+from sqlalchemy import delete  # noqa: E402
+
+from app.db.database import SessionLocal, engine  # noqa: E402
+from app.db.models import Base, Ingredient, Recipe, RecipeIngredient  # noqa: E402
+from app.schemas.recipe import RecipeOut  # noqa: E402
+from app.scripts.seed_basic import upsert_recipe  # noqa: E402
+from app.services.bulk_io import export_stream, import_blocks  # noqa: E402
+from app.services.recipe_index import recipe_index  # noqa: E402
+
+_FOODS = ["egg", "rice", "paneer", "oats", "milk", "bread", "tomato", "onion", "garlic", "curd", "toor dal",
+          "chicken", "tofu", "spinach", "150g basmati rice", "2 tbsp olive oil", "1 tsp salt", "soy sauce"]
+
+
+def records(n: int):
+    rng = random.Random(0)
+    for i in range(n):
+        yield {
+            "title": f"Recipe {i}",
+            "description": "Synthetic recipe",
+            "ingredients": ", ".join(rng.sample(_FOODS, rng.randint(3, 8))),
+            "instructions": "Mix, cook, and serve.",
+            "calories": rng.randint(150, 900) if i % 2 else None,
+            "protein": rng.randint(5, 60) if i % 2 else None,
+            "carbs": rng.randint(5, 90) if i % 2 else None,
+            "fat": rng.randint(2, 40) if i % 2 else None,
+            "time_minutes": rng.choice([10, 15, 20, 30, 45]),
+        }
+
+
+def _reset() -> None:
+    with SessionLocal() as db:
+        for model in (RecipeIngredient, Ingredient, Recipe):
+            db.execute(delete(model))
+        db.commit()
+        recipe_index.build(db)
+
+
+def _rate(label: str, n: int, dt: float) -> None:
+    print(f"  {label:34} {n / dt:12,.0f} rows/s  ({dt:7.2f} s, {n:,} rows)")
+
+
+def _blocks(data: bytes, size: int = 1 << 20):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def _import(label: str, data: bytes, fmt: str, n: int) -> None:
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        stats = import_blocks(db, "recipes", _blocks(data), fmt)
+        _rate(label, n, time.perf_counter() - start)
+    assert stats.received == n, stats
+
+
+async def _export(fmt: str) -> int:
+    size = 0
+    async for text in export_stream(Recipe, tuple(RecipeOut.model_fields), fmt):
+        size += len(text)
+    return size
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    Base.metadata.create_all(bind=engine)
+    rows = list(records(n))
+    ndjson = "".join(json.dumps(r) + "\n" for r in rows).encode()
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=list(rows[0]))
+    w.writeheader()
+    w.writerows(rows)
+    csv_data = buf.getvalue().encode()
+    print(f"{n:,} recipes ({len(ndjson) / 1e6:.1f} MB NDJSON, {len(csv_data) / 1e6:.1f} MB CSV)")
+
+    _reset()
+    k = min(n, 2000)
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        for r in rows[:k]:
+            upsert_recipe(db, r["title"], r["ingredients"], r["time_minutes"], r["calories"], r["protein"], r["carbs"], r["fat"])
+        _rate("seed_basic.upsert_recipe", k, time.perf_counter() - start)
+
+    _reset()
+    _import("import ndjson", ndjson, "ndjson", n)
+    _import("re-import ndjson (all duplicates)", ndjson, "ndjson", n)
+    _reset()
+    _import("import csv", csv_data, "csv", n)
+    assert len(recipe_index) == n
+
+    for fmt in ("ndjson", "csv"):
+        start = time.perf_counter()
+        size = asyncio.run(_export(fmt))
+        _rate(f"export {fmt} ({size / 1e6:.1f} MB)", n, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
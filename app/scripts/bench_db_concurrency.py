@@ -0,0 +1,127 @@
+# app/scripts/bench_db_concurrency.py
+"""
+Mixed read/write throughput of the default SQLite engine vs the tuned one.
+
+    python -m app.scripts.bench_db_concurrency [seconds] [readers] [writers]
+
+Each run gets a fresh temp database seeded with 5k recipes. Reader threads
+do what /recipes/suggest does per request (load the pantry, then a filtered
+recipe scan). Writer threads add and delete pantry items, one commit each,
+as the pantry endpoints do. Reported per engine: reads/s, writes/s, and how
+many operations failed with "database is locked".
+
+  baseline: create_engine(url, check_same_thread=False), rollback journal
+  tuned:    app.db.database.make_engine (WAL, synchronous=NORMAL, cache/mmap)
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import Settings
+from app.db.database import Base, make_engine
+from app.db.models import PantryItem, Recipe
+
+_FOODS = ["egg", "rice", "paneer", "oats", "milk", "bread", "tomato", "onion", "garlic", "curd", "dal", "chicken"]
+
+
+def _seed(Session) -> None:
+    rng = random.Random(0)
+    with Session() as db:
+        db.add_all(
+            Recipe(
+                title=f"recipe {i}",
+                ingredients=", ".join(rng.sample(_FOODS, 4)),
+                calories=rng.randint(150, 900),
+                protein=rng.randint(5, 60),
+                carbs=rng.randint(5, 90),
+                fat=rng.randint(2, 40),
+                time_minutes=rng.choice([10, 15, 20, 30, 45]),
+            )
+            for i in range(5000)
+        )
+        db.add_all(PantryItem(name=f, quantity=1, unit="pc") for f in _FOODS[:6])
+        db.commit()
+
+
+def _run(label: str, engine, seconds: float, readers: int, writers: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    _seed(Session)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+
+    def bump(key: str) -> None:
+        with lock:
+            counts[key] += 1
+
+    def reader(seed: int) -> None:
+        rng = random.Random(seed)
+        while not stop.is_set():
+            try:
+                with Session() as db:
+                    pantry = [p.name for p in db.query(PantryItem).all()]
+                    food = rng.choice(pantry or _FOODS)
+                    db.query(Recipe.id, Recipe.protein, Recipe.calories).filter(
+                        Recipe.ingredients.like(f"%{food}%"), Recipe.calories <= rng.randint(300, 900)
+                    ).order_by(Recipe.protein.desc()).limit(50).all()
+                bump("reads")
+            except OperationalError:
+                bump("locked")
+
+    def writer(seed: int) -> None:
+        rng = random.Random(seed)
+        while not stop.is_set():
+            try:
+                with Session() as db:
+                    item = PantryItem(name=rng.choice(_FOODS), quantity=rng.randint(1, 5), unit="pc")
+                    db.add(item)
+                    db.commit()
+                    db.delete(item)
+                    db.commit()
+                bump("writes")
+            except OperationalError:
+                bump("locked")
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    dt = time.perf_counter() - start
+
+    with Session() as db:
+        assert db.query(func.count(Recipe.id)).scalar() == 5000
+    engine.dispose()
+    print(
+        f"  {label:9} {counts['reads'] / dt:10,.0f} reads/s {counts['writes'] / dt:10,.0f} writes/s"
+        f" {counts['locked']:6} locked"
+    )
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    print(f"{seconds:g}s, {readers} readers, {writers} writers")
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'baseline.db')}"
+        _run("baseline", create_engine(url, connect_args={"check_same_thread": False}), seconds, readers, writers)
+        url = f"sqlite:///{os.path.join(tmp, 'tuned.db')}"
+        _run("tuned", make_engine(url, Settings()), seconds, readers, writers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# app/scripts/bench_instructions.py
+"""
+Golden check + microbenchmark for app.ml.instructions.fix_instructions.
+
+    python -m app.scripts.bench_instructions            # verify goldens, then time
+    python -m app.scripts.bench_instructions --update   # rewrite expected outputs
+
+The corpus (recordings/instruction_corpus.json) holds instruction payloads
+in the shapes models actually return: lists with and without numbering,
+run-on strings with inline step numbers, semicolon chains, junk entries,
+non-list values. Each input is stored with its expected normalized output.
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+from app.ml.instructions import fix_instructions
+
+CORPUS = Path(__file__).parent / "recordings" / "instruction_corpus.json"
+
+
+def check(cases) -> int:
+    failed = 0
+    for i, case in enumerate(cases):
+        got = fix_instructions(case["input"])
+        if got != case["expected"]:
+            failed += 1
+            print(f"case {i} differs:\n  input:    {case['input']!r}\n  expected: {case['expected']}\n  got:      {got}")
+    return failed
+
+
+def bench(cases, rounds: int = 2000) -> None:
+    inputs = [c["input"] for c in cases]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for x in inputs:
+            fix_instructions(x)
+    elapsed = time.perf_counter() - start
+    n = rounds * len(inputs)
+    print(f"{n} recipes in {elapsed:.3f}s -> {n / elapsed:,.0f} recipes/s ({elapsed / n * 1e6:.1f} µs each)")
+
+
+def main() -> None:
+    cases = json.loads(CORPUS.read_text(encoding="utf-8"))
+    if "--update" in sys.argv:
+        for case in cases:
+            case["expected"] = fix_instructions(case["input"])
+        CORPUS.write_text(json.dumps(cases, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"updated {len(cases)} golden outputs")
+        return
+    failed = check(cases)
+    print(f"{len(cases) - failed}/{len(cases)} golden cases match")
+    if failed:
+        sys.exit(1)
+    bench(cases)
+
+
+if __name__ == "__main__":
+    main()
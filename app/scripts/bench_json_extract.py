@@ -0,0 +1,87 @@
+# app/scripts/bench_json_extract.py
+"""
+Benchmark for pulling the JSON object out of long, chatty model output.
+
+    python -m app.scripts.bench_json_extract
+
+Compares the previous strict-parse -> find/rfind -> greedy-regex fallback
+chain with app.ml.json_stream.extract_first_object, on whole strings and
+fed in 16-char chunks through JsonObjectScanner (the streaming path).
+"""
+import json
+import random
+import re
+import time
+
+from app.ml.json_stream import JsonObjectScanner, extract_first_object
+
+
+def _legacy_extract(s: str):
+    s = s.strip()
+    try:
+        return json.loads(s)
+    except Exception:
+        pass
+    start, end = s.find("{"), s.rfind("}")
+    if start != -1 and end != -1 and end > start:
+        try:
+            return json.loads(s[start:end + 1])
+        except Exception:
+            m = re.search(r"\{.*\}", s, re.DOTALL)
+            if m:
+                try:
+                    return json.loads(m.group(0))
+                except Exception:
+                    return None
+    return None
+
+
+def _recipe(i: int) -> dict:
+    return {
+        "title": f"Recipe {i} with {{braces}} and \"quotes\"",
+        "cuisine": "Thai",
+        "ingredients": [f"{random.randint(1, 500)}g item {j}" for j in range(12)],
+        "instructions": [f"{j}. Cook step {j} on medium heat for {j} min; stir {{gently}}." for j in range(1, 9)],
+        "macros": {"calories": 500, "protein": 30, "carbs": 40, "fat": 20},
+    }
+
+
+def _samples():
+    random.seed(0)
+    payload = json.dumps({"recipes": [_recipe(i) for i in range(40)]})
+    chatter = "Sure! Here is what you asked for {as requested}. " * 200
+    return {
+        "clean json": payload,
+        "prose before": chatter + payload,
+        "prose around": chatter + payload + "\n\nLet me know if you want {more} variations! " * 200,
+        "prose + trailing object": chatter + payload + ' P.S. {"note": "extra"}',
+    }
+
+
+def _time(fn, s: str, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(s)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def _chunked(s: str, size: int = 16):
+    scanner = JsonObjectScanner()
+    for i in range(0, len(s), size):
+        if scanner.feed(s[i:i + size]) is not None:
+            break
+    return scanner.result
+
+
+def main(rounds: int = 30) -> None:
+    for name, s in _samples().items():
+        legacy = _legacy_extract(s)
+        new = extract_first_object(s)
+        print(f"{name} ({len(s) / 1024:.0f} KiB): legacy {'ok' if legacy == new else 'DIFFERS/FAILS'}")
+        print(f"  legacy      {_time(_legacy_extract, s, rounds):8.2f} ms")
+        print(f"  single-pass {_time(extract_first_object, s, rounds):8.2f} ms")
+        print(f"  chunked/16  {_time(_chunked, s, rounds):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
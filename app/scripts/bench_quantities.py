@@ -0,0 +1,59 @@
+# app/scripts/bench_quantities.py
+"""
+Throughput benchmark for quantity-aware ingredient parsing and estimation.
+
+    python -m app.scripts.bench_quantities [n_lines]
+
+Builds a synthetic corpus (default 200k lines, with the repetition a real
+catalog has) and reports lines/s for:
+  - parse_line with the cache cleared each round (compiled regex cost),
+  - parse_line warm (per-line cache),
+  - estimate_macros_bulk over recipes of 6 lines each, cold and warm.
+"""
+import random
+import sys
+import time
+
+from app.services import nutrition
+from app.services.nutrition import estimate_macros_bulk
+from app.services.quantities import parse_line
+
+_AMOUNTS = ["", "1 ", "2 ", "150g ", "200 g ", "1 1/2 tbsp ", "½ cup ", "2-3 ", "a pinch of ", "1 tsp ", "3 cloves ", "1 l "]
+_FOODS = ["egg", "eggs", "rice", "basmati rice", "olive oil", "soy sauce", "peanut butter", "tomatoes",
+          "paneer", "oats", "chick peas", "curd", "milk", "bread", "butter", "spring onion", "garlic", "salt"]
+
+
+def corpus(n: int, distinct: int = 20000):
+    rng = random.Random(0)
+    pool = [f"{rng.choice(_AMOUNTS)}{rng.choice(_FOODS)}" + (f" {i}" if i % 3 else "") for i in range(distinct)]
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def _rate(label: str, n: int, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - start
+    print(f"  {label:32} {n / dt:12,.0f} lines/s  ({dt * 1000:8.1f} ms)")
+
+
+def _clear() -> None:
+    for fn in (parse_line, nutrition.match_ingredient, nutrition._line_grams, nutrition._part_macros, nutrition._estimate):
+        fn.cache_clear()
+
+
+def main(n: int = 200_000) -> None:
+    lines = corpus(n)
+    recipes = [", ".join(lines[i:i + 6]) for i in range(0, n, 6)]
+    print(f"{n:,} lines, {len(set(lines)):,} distinct; {len(recipes):,} recipes")
+
+    _clear()
+    _rate("parse_line (cold)", n, lambda: [parse_line(l) for l in lines])
+    _rate("parse_line (warm)", n, lambda: [parse_line(l) for l in lines])
+    _clear()
+    _rate("estimate_macros_bulk (cold)", n, lambda: estimate_macros_bulk(recipes))
+    _rate("estimate_macros_bulk (warm)", n, lambda: estimate_macros_bulk(recipes))
+    print(nutrition.cache_info())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
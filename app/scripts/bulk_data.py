@@ -0,0 +1,94 @@
+# app/scripts/bulk_data.py
+"""
+Bulk import / export of recipes and pantry items (see app/services/bulk_io.py).
+
+    python -m app.scripts.bulk_data import recipes recipes.ndjson
+    python -m app.scripts.bulk_data import pantry pantry.csv --owner household-42
+    python -m app.scripts.bulk_data export recipes out.csv --fields title,ingredients,calories
+    python -m app.scripts.bulk_data export pantry -            # NDJSON to stdout
+
+The format comes from the file extension (.csv, otherwise NDJSON) unless
+--format is given. Pantry rows belong to --owner (by default the household
+used for requests without X-Owner-Id). Import skips recipes whose title
+already exists, so re-running it is safe. A running API picks up recipes
+imported here after a restart; POST /recipes/import updates it in place.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.db.database import SessionLocal, engine
+from app.db.migrations import add_missing_columns
+from app.db.models import DEFAULT_OWNER, Base, PantryItem, Recipe
+from app.schemas.pantry import PantryOut
+from app.schemas.recipe import RecipeOut
+from app.services.bulk_io import DEFAULT_CHUNK, export_stream, import_blocks
+from app.services.listing import select_fields
+
+MODELS = {"recipes": (Recipe, tuple(RecipeOut.model_fields)), "pantry": (PantryItem, tuple(PantryOut.model_fields))}
+BLOCK = 1 << 20
+
+
+def _format(path: str, given: str) -> str:
+    return given or ("csv" if path.lower().endswith(".csv") else "ndjson")
+
+
+def _blocks(f):
+    while block := f.read(BLOCK):
+        yield block
+
+
+def run_import(kind: str, path: str, fmt: str, chunk_size: int, owner_id: str) -> None:
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        with (sys.stdin.buffer if path == "-" else open(path, "rb")) as f:
+            stats = import_blocks(db, kind, _blocks(f), fmt, chunk_size, owner_id=owner_id)
+    finally:
+        db.close()
+    dt = time.perf_counter() - start
+    print(
+        f"{kind}: {stats.received} read, {stats.inserted} inserted, {stats.duplicates} duplicates, "
+        f"{stats.invalid} invalid in {dt:.2f} s ({stats.received / dt:,.0f} rows/s)",
+        file=sys.stderr,
+    )
+    for e in stats.errors:
+        print(f"  record {e['record']}: {e['error']}", file=sys.stderr)
+
+
+async def run_export(kind: str, path: str, fmt: str, fields: str, chunk_size: int, owner_id: str) -> None:
+    model, allowed = MODELS[kind]
+    columns = select_fields(fields, allowed)
+    where = [PantryItem.owner_id == owner_id] if kind == "pantry" else []
+    out = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+    try:
+        async for text in export_stream(model, columns, fmt, chunk_size, where=where):
+            out.write(text)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("action", choices=("import", "export"))
+    ap.add_argument("kind", choices=tuple(MODELS))
+    ap.add_argument("path", help="file to read/write, or - for stdin/stdout")
+    ap.add_argument("--format", choices=("ndjson", "csv"), default="")
+    ap.add_argument("--fields", default="", help="export only: comma-separated columns")
+    ap.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK)
+    ap.add_argument("--owner", default=DEFAULT_OWNER, help="pantry only: household the rows belong to")
+    args = ap.parse_args()
+
+    fmt = _format(args.path, args.format)
+    if args.action == "import":
+        run_import(args.kind, args.path, fmt, args.chunk_size, args.owner)
+    else:
+        asyncio.run(run_export(args.kind, args.path, fmt, args.fields, args.chunk_size, args.owner))
+
+
+if __name__ == "__main__":
+    main()
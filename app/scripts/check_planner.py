@@ -0,0 +1,98 @@
+# app/scripts/check_planner.py
+"""
+Brute-force cross-check and timing for the meal planner (app/services/planner.py).
+
+    python -m app.scripts.check_planner [cases] [catalog_size]
+
+Builds small random catalogs (default 300 cases) and compares plan_day with
+an exhaustive search over every combination of dishes. Both rank plans the
+same way: the most protein up to the target, then the most pantry fit, then
+the fewest calories, at the protein and calorie resolution plan_day uses.
+Plans are compared by those values, since equally good plans may pick
+different rows. Then it times plan_day and plan_week on a synthetic catalog
+(default 20k recipes) whose pantry fits look like real ones: a quarter of
+each recipe's 3-12 ingredients in the pantry, on average.
+"""
+import random
+import sys
+import time
+from itertools import combinations
+
+import numpy as np
+
+from app.services.planner import _protein_units, _resolution, plan_day, plan_week
+from app.services.recipe_index import RecipeColumns
+
+
+def columns(n: int, rng: random.Random, dup_titles: bool = False) -> RecipeColumns:
+    titles = [f"dish {rng.randrange(n // 2 + 1)}" if dup_titles else f"dish {i}" for i in range(n)]
+    calories = np.array([0 if rng.random() < 0.05 else rng.randint(80, 900) for _ in range(n)], dtype=np.float64)
+    protein = np.array([rng.randint(0, 70) for _ in range(n)], dtype=np.float64)
+    dish = np.unique(np.array([t.lower() for t in titles], dtype=object), return_inverse=True)[1]
+    # only the columns plan_day reads
+    return RecipeColumns(
+        entries=tuple(range(n)), ids=np.arange(n), macros=np.zeros((n, 4), np.float32), protein=protein,
+        calories=calories, time_minutes=np.zeros(n), n_ingredients=np.zeros(n), nutrition=np.zeros(n),
+        by_nutrition=np.arange(n), dish=dish, rows={i: i for i in range(n)},
+    )
+
+
+def objective(cols: RecipeColumns, fit: np.ndarray, rows, target: int, grams: int):
+    rows = list(rows)
+    return (
+        min(int(_protein_units(cols.protein[rows], grams).sum()), -(-target // grams)),
+        int(np.rint(fit[rows] * 1000).sum()),
+        -int(cols.calories[rows].sum()),
+    )
+
+
+def brute_force(cols: RecipeColumns, fit: np.ndarray, meals: int, target: int, calorie_cap: int):
+    step, grams = _resolution(meals, target, calorie_cap)
+    cap = calorie_cap // step
+    buckets = np.ceil(cols.calories / step)
+    first = {}
+    for r in range(len(cols)):
+        if cols.calories[r] > 0 and buckets[r] <= cap:
+            first.setdefault(int(cols.dish[r]), r)
+    rows = sorted(first.values())
+    for n in range(min(meals, len(rows)), 0, -1):
+        plans = [c for c in combinations(rows, n) if buckets[list(c)].sum() <= cap]
+        if plans:
+            return max(objective(cols, fit, c, target, grams) for c in plans), n
+    return None, 0
+
+
+def check(cases: int) -> None:
+    rng = random.Random(17)
+    for case in range(cases):
+        cols = columns(rng.randint(1, 14), rng, dup_titles=case % 3 == 0)
+        fit = np.array([round(rng.choice([0.0, 0.0, rng.random()]), 3) for _ in range(len(cols))])
+        meals, target, calorie_cap = rng.randint(1, 6), rng.randint(10, 300), rng.randint(300, 4000)
+        plan = plan_day(cols, fit, meals, target, calorie_cap)
+        want, n = brute_force(cols, fit, meals, target, calorie_cap)
+        grams = _resolution(meals, target, calorie_cap)[1]
+        got = objective(cols, fit, plan.rows, target, grams) if plan else None
+        if got != want or (plan and len(plan.rows) != n) or (plan and len(set(cols.dish[list(plan.rows)])) != n):
+            raise SystemExit(f"case {case}: meals={meals} target={target} cap={calorie_cap}: planner {got} vs brute force {want}")
+    print(f"{cases} random cases match the brute-force search")
+
+
+def bench(n: int) -> None:
+    rng = random.Random(0)
+    cols = columns(n, rng)
+    fit = np.array([round(sum(rng.random() < 0.25 for _ in range(k)) / k, 3) for k in (rng.randint(3, 12) for _ in range(n))])
+    for meals, target, cap in [(3, 120, 1800), (6, 300, 4000)]:
+        day = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            plan_day(cols, fit, meals, target, cap)
+            day = min(day, time.perf_counter() - start)
+        start = time.perf_counter()
+        plan_week(cols, fit, 7, meals, target, cap)
+        week = time.perf_counter() - start
+        print(f"{n:,} recipes, meals={meals} target={target} cap={cap}: day {day * 1000:.1f} ms, week {week * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    check(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
+    bench(int(sys.argv[2]) if len(sys.argv) > 2 else 20_000)
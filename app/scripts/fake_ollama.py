@@ -0,0 +1,131 @@
+# app/scripts/fake_ollama.py
+"""
+Tiny stand-in for a local Ollama server, for exercising the LLM endpoints
+without a model:
+
+    uvicorn app.scripts.fake_ollama:app --port 11434
+
+Answers POST /api/chat with a canned recipe after FAKE_OLLAMA_DELAY seconds
+(default 0.5) and counts calls and peak concurrency at GET /stats.
+
+With "stream": true it streams NDJSON chunks like Ollama does. If
+FAKE_OLLAMA_RECORDING points at a recorded chunk stream (one Ollama chunk
+per line, e.g. recordings/ollama_stream_recipes.ndjson) that is replayed
+verbatim, FAKE_OLLAMA_CHUNK_DELAY seconds apart (default 0.02).
+
+A recording can also be replayed straight through the stream parser,
+without any server, to see when each recipe becomes available:
+
+    python -m app.scripts.fake_ollama replay app/scripts/recordings/ollama_stream_recipes.ndjson
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.ml.json_stream import RecipeStreamParser
+
+app = FastAPI(title="fake ollama")
+
+DELAY = float(os.getenv("FAKE_OLLAMA_DELAY", "0.5"))
+CHUNK_DELAY = float(os.getenv("FAKE_OLLAMA_CHUNK_DELAY", "0.02"))
+RECORDING = os.getenv("FAKE_OLLAMA_RECORDING")
+stats = {"calls": 0, "in_flight": 0, "peak_in_flight": 0}
+
+
+def _recipe(prompt: str) -> dict:
+    m = re.search(r"MUST be (\w+) cuisine", prompt)
+    cuisine = m.group(1) if m else "Fusion"
+    m = re.search(r"Ingredients available: (.*)", prompt)
+    ingredients = [i.strip() for i in (m.group(1) if m else "egg").split(",") if i.strip()]
+    n = re.search(r"recipe (\d+) of", prompt)
+    return {
+        "title": f"{cuisine} {ingredients[0].title()} Bowl{' #' + n.group(1) if n else ''}",
+        "cuisine": cuisine,
+        "ingredients": ingredients,
+        "instructions": [
+            "Heat oil in a pan over medium heat for 1 min.",
+            f"Add {ingredients[0]} and cook for 4 minutes, stirring.",
+            "Season with salt and simmer on low heat for 3 min.",
+            "Rest off the heat for 1 min.",
+            "Plate and garnish.",
+        ],
+        "macros": {"calories": 420, "protein": 24, "carbs": 38, "fat": 16},
+    }
+
+
+def _recorded_chunks(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _synth_chunks(model: str, prompt: str, size: int = 12):
+    m = re.search(r"Generate exactly (\d+) recipe", prompt)
+    n = int(m.group(1)) if m else 1
+    recipes = [_recipe(prompt + f"\nThis is recipe {i} of {n}") for i in range(1, n + 1)] if n > 1 else [_recipe(prompt)]
+    content = json.dumps({"recipes": recipes} if n > 1 else recipes[0])
+    for i in range(0, len(content), size):
+        yield {"model": model, "message": {"role": "assistant", "content": content[i:i + size]}, "done": False}
+    yield {"model": model, "message": {"role": "assistant", "content": ""}, "done": True}
+
+
+async def _stream(model: str, prompt: str):
+    chunks = _recorded_chunks(RECORDING) if RECORDING else _synth_chunks(model, prompt)
+    stats["in_flight"] += 1
+    stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+    try:
+        for chunk in chunks:
+            await asyncio.sleep(CHUNK_DELAY)
+            yield json.dumps(chunk) + "\n"
+    finally:
+        stats["in_flight"] -= 1
+
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    body = await request.json()
+    prompt = body["messages"][-1]["content"]
+    stats["calls"] += 1
+    if body.get("stream"):
+        return StreamingResponse(_stream(body.get("model"), prompt), media_type="application/x-ndjson")
+    stats["in_flight"] += 1
+    stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(DELAY)
+    finally:
+        stats["in_flight"] -= 1
+    content = json.dumps(_recipe(prompt))
+    return {"model": body.get("model"), "message": {"role": "assistant", "content": content}, "done": True}
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+def replay(path: str) -> None:
+    """Feed a recorded chunk stream through RecipeStreamParser and report when each recipe closes."""
+    chunks = _recorded_chunks(path)
+    parser = RecipeStreamParser()
+    total = sum(len((c.get("message") or {}).get("content", "")) for c in chunks)
+    seen = 0
+    start = time.perf_counter()
+    for i, chunk in enumerate(chunks, 1):
+        piece = (chunk.get("message") or {}).get("content", "")
+        seen += len(piece)
+        for r in parser.feed(piece):
+            ms = (time.perf_counter() - start) * 1000
+            print(f"chunk {i}/{len(chunks)} ({seen}/{total} chars, {ms:.2f} ms): {r.get('title')!r}")
+    print(f"{parser.emitted} recipe(s); parser done={parser.done}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "replay":
+        replay(sys.argv[2])
+    else:
+        print("usage: python -m app.scripts.fake_ollama replay <recording.ndjson>")
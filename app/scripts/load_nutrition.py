@@ -0,0 +1,87 @@
+# app/scripts/load_nutrition.py
+"""
+Import a food-composition dataset into a nutrient store (see
+app/services/nutrient_store.py):
+
+    python -m app.scripts.load_nutrition foods.csv --out data/nutrients \\
+        --rename "Energy (kcal)=calories" --rename "Protein (g)=protein" \\
+        --rename "Carbohydrate (g)=carbs" --rename "Total fat (g)=fat"
+
+Then point the API at it with NUTRITION_STORE_PATH=data/nutrients.
+
+Input is CSV (header row), a JSON array of objects, a JSON object of
+{name: {column: value}}, or JSON lines (.jsonl / .ndjson). Values are per
+100 g. The optional "grams" column is the default portion used when a
+recipe gives no quantity (100 g otherwise). All non-name columns are kept
+unless --columns narrows them; the estimator reads calories, protein,
+carbs and fat.
+"""
+import argparse
+import csv
+import json
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from app.services.nutrient_store import NutrientStore
+
+
+def _read(path: str) -> Iterator[Dict[str, object]]:
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+    elif path.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            for name, vals in data.items():
+                yield {"name": name, **vals}
+        else:
+            yield from data
+
+
+def load(path: str, out: str, name_column: str, columns: List[str], rename: Dict[str, str]) -> NutrientStore:
+    records = ({rename.get(k, k): v for k, v in rec.items()} for rec in _read(path))
+    first = next(records, None)
+    if first is None:
+        raise SystemExit(f"{path}: no records")
+    if not columns:
+        columns = [c for c in first if c != name_column]
+
+    def pairs() -> Iterator[Tuple[str, Dict[str, object]]]:
+        for rec in (first, *records):
+            yield str(rec.get(name_column) or ""), rec
+
+    store = NutrientStore.from_records(pairs(), columns)
+    store.save(out)
+    return store
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("dataset")
+    ap.add_argument("--out", required=True, help="store directory to write")
+    ap.add_argument("--name-column", default="name")
+    ap.add_argument("--columns", default="", help="comma-separated columns to keep (after renaming)")
+    ap.add_argument("--rename", action="append", default=[], metavar="OLD=NEW")
+    args = ap.parse_args()
+
+    rename = dict(r.split("=", 1) for r in args.rename)
+    columns = [c.strip() for c in args.columns.split(",") if c.strip()]
+    start = time.perf_counter()
+    store = load(args.dataset, args.out, args.name_column, columns, rename)
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    NutrientStore.open(args.out)
+    opened = time.perf_counter() - start
+    print(f"{len(store)} foods x {len(store.columns)} columns -> {args.out} "
+          f"(import {built:.2f} s, open {opened * 1000:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
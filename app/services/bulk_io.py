@@ -0,0 +1,303 @@
+# apps/api/app/services/bulk_io.py
+"""
+Bulk import / export of recipes and pantry items as NDJSON or CSV.
+
+Import is streamed. Bytes are decoded into records incrementally, and
+records are validated with the same schemas as the /add endpoints. They
+are then written in chunks, one transaction per chunk:
+  - recipes are deduplicated by title (stripped, exact) in one pass per
+    chunk, against the chunk itself and against the table (a single
+    `title IN (...)` query). New rows go in as one Core executemany INSERT,
+    their recipe_ingredients rows are written, and the recipe index is
+    updated.
+  - pantry items are appended to one owner's pantry as they are (the
+    pantry may legitimately hold the same item twice, e.g. with different
+    expiry dates).
+Invalid records are counted and skipped; the first MAX_ERRORS are reported
+with their record number.
+
+Export walks the table by id in keyset pages (see app.services.listing),
+so memory stays bounded by the chunk size however large the table is.
+"""
+from __future__ import annotations
+
+import asyncio
+import codecs
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.db.database import AsyncSessionLocal, SessionLocal
+from app.db.models import DEFAULT_OWNER, PantryItem, Recipe
+from app.schemas.pantry import PantryCreate
+from app.schemas.recipe import RecipeCreate
+from app.services.ingredients import sync_recipe_ingredients
+from app.services.listing import keyset_page
+from app.services.pantry import pantry_cache
+from app.services.recipe_index import recipe_index
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+DEFAULT_CHUNK = 1000
+MAX_ERRORS = 20
+
+Record = Tuple[int, Any]  # (1-based record number, decoded object or the decode error)
+
+
+@dataclass
+class ImportStats:
+    received: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def reject(self, n: int, error: object) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"record": n, "error": str(error)})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "errors": self.errors,
+        }
+
+
+# ---------- decoding ----------
+class RecordDecoder:
+    """
+    Incremental NDJSON / CSV decoder: feed() bytes as they arrive and get
+    back the records completed so far. CSV needs a header row; quoted fields
+    may span lines and chunks. Empty CSV cells are dropped, so schema
+    defaults apply.
+    """
+
+    def __init__(self, fmt: str) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown format {fmt!r}; choose from {', '.join(FORMATS)}")
+        self.fmt = fmt
+        self._utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+        self._tail = ""  # text after the last newline
+        self._lines: List[str] = []  # lines of a CSV record still inside quotes
+        self._quotes = 0
+        self._header: Optional[List[str]] = None
+        self._n = 0
+
+    def feed(self, data: bytes) -> List[Record]:
+        text = self._tail + self._utf8.decode(data)
+        lines = text.split("\n")
+        self._tail = lines.pop()
+        return self._decode(lines)
+
+    def close(self) -> List[Record]:
+        text = self._tail + self._utf8.decode(b"", final=True)
+        self._tail = ""
+        out = self._decode([text] if text else [])
+        if self._lines:  # unterminated quote: hand csv what is there
+            out += self._csv(["\n".join(self._lines)])
+            self._lines = []
+        return out
+
+    def _decode(self, lines: List[str]) -> List[Record]:
+        if self.fmt == "ndjson":
+            out = []
+            for line in lines:
+                if line.strip():
+                    self._n += 1
+                    try:
+                        out.append((self._n, json.loads(line)))
+                    except ValueError as e:
+                        out.append((self._n, e))
+            return out
+
+        records = []
+        for line in lines:
+            self._lines.append(line)
+            self._quotes += line.count('"')
+            if self._quotes % 2 == 0:
+                records.append("\n".join(self._lines))
+                self._lines = []
+                self._quotes = 0
+        return self._csv(records)
+
+    def _csv(self, records: List[str]) -> List[Record]:
+        out = []
+        for row in csv.reader(r for r in records if r.strip()):
+            if self._header is None:
+                self._header = [h.strip() for h in row]
+                continue
+            self._n += 1
+            out.append((self._n, {k: v for k, v in zip(self._header, row) if v != ""}))
+        return out
+
+
+def _validate(schema: type[BaseModel], n: int, raw: Any, stats: ImportStats) -> Optional[Dict[str, Any]]:
+    stats.received += 1
+    if isinstance(raw, Exception):
+        stats.reject(n, raw)
+        return None
+    if not isinstance(raw, dict):
+        stats.reject(n, "expected an object")
+        return None
+    try:
+        return schema.model_validate(raw).model_dump()
+    except ValidationError as e:
+        stats.reject(n, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+        return None
+
+
+# ---------- import ----------
+def import_recipe_chunk(db: Session, records: Sequence[Record], stats: ImportStats) -> List[Recipe]:
+    """Validate, dedupe and insert one chunk of recipe records; commits. Returns the new recipes."""
+    rows: Dict[str, Dict[str, Any]] = {}
+    for n, raw in records:
+        rec = _validate(RecipeCreate, n, raw, stats)
+        if rec is None:
+            continue
+        rec["title"] = rec["title"].strip()
+        if not rec["title"]:
+            stats.reject(n, "title: must not be empty")
+        elif rec["title"] in rows:
+            stats.duplicates += 1
+        else:
+            rows[rec["title"]] = rec
+    if not rows:
+        return []
+
+    existing = set(db.scalars(select(Recipe.title).where(Recipe.title.in_(rows))))
+    new = [rec for title, rec in rows.items() if title not in existing]
+    stats.duplicates += len(rows) - len(new)
+    if not new:
+        return []
+
+    # Core executemany; RETURNING in parameter order gives each record its id
+    # (titles can't map them back: rows written outside this importer may share one)
+    table = Recipe.__table__
+    ids = db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), new).scalars().all()
+    # detached copies carry what the ingredient sync and the index read
+    recipes = [Recipe(id=rid, **rec) for rid, rec in zip(ids, new)]
+    sync_recipe_ingredients(db, recipes)
+    db.commit()
+    stats.inserted += len(recipes)
+    recipe_index.upsert_many(recipes)
+    return recipes
+
+
+def import_pantry_chunk(
+    db: Session, records: Sequence[Record], stats: ImportStats, owner_id: str = DEFAULT_OWNER
+) -> None:
+    """Validate and insert one chunk of pantry records into owner_id's pantry; commits."""
+    rows = [
+        {**rec, "owner_id": owner_id}
+        for n, raw in records
+        if (rec := _validate(PantryCreate, n, raw, stats)) is not None
+    ]
+    if rows:
+        db.execute(insert(PantryItem), rows)
+        db.commit()
+        stats.inserted += len(rows)
+        pantry_cache.invalidate(owner_id)
+
+
+IMPORTERS: Dict[str, Callable[..., Any]] = {
+    "recipes": import_recipe_chunk,
+    "pantry": import_pantry_chunk,
+}
+
+
+def _importer(kind: str, owner_id: str) -> Callable[[Session, Sequence[Record], ImportStats], Any]:
+    # the recipe catalog is shared; only pantry rows belong to an owner
+    return partial(import_pantry_chunk, owner_id=owner_id) if kind == "pantry" else IMPORTERS[kind]
+
+
+def import_blocks(
+    db: Session,
+    kind: str,
+    blocks: Iterable[bytes],
+    fmt: str,
+    chunk_size: int = DEFAULT_CHUNK,
+    owner_id: str = DEFAULT_OWNER,
+) -> ImportStats:
+    """Import `kind` ("recipes" or "pantry") from an iterable of raw byte blocks."""
+    importer = _importer(kind, owner_id)
+    decoder = RecordDecoder(fmt)
+    stats = ImportStats()
+    pending: List[Record] = []
+    for block in blocks:
+        pending += decoder.feed(block)
+        while len(pending) >= chunk_size:
+            importer(db, pending[:chunk_size], stats)
+            del pending[:chunk_size]
+    pending += decoder.close()
+    for i in range(0, len(pending), chunk_size):
+        importer(db, pending[i : i + chunk_size], stats)
+    return stats
+
+
+async def import_stream(
+    kind: str,
+    blocks: AsyncIterator[bytes],
+    fmt: str,
+    chunk_size: int = DEFAULT_CHUNK,
+    owner_id: str = DEFAULT_OWNER,
+) -> ImportStats:
+    """import_blocks for a request body; each chunk is written from a worker thread."""
+    importer = _importer(kind, owner_id)
+    decoder = RecordDecoder(fmt)
+    stats = ImportStats()
+    pending: List[Record] = []
+    db = SessionLocal()
+    try:
+        async for block in blocks:
+            pending += decoder.feed(block)
+            while len(pending) >= chunk_size:
+                await asyncio.to_thread(importer, db, pending[:chunk_size], stats)
+                del pending[:chunk_size]
+        pending += decoder.close()
+        for i in range(0, len(pending), chunk_size):
+            await asyncio.to_thread(importer, db, pending[i : i + chunk_size], stats)
+    finally:
+        db.close()
+    return stats
+
+
+# ---------- export ----------
+def _encode(rows: List[Dict[str, Any]], fmt: str, fields: Sequence[str], header: bool) -> str:
+    if fmt == "ndjson":
+        return "".join(json.dumps(r, default=str, ensure_ascii=False) + "\n" for r in rows)
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    if header:
+        w.writerow(fields)
+    w.writerows([r[f] for f in fields] for r in rows)
+    return buf.getvalue()
+
+
+async def export_stream(
+    model: Any, fields: Sequence[str], fmt: str, chunk_size: int = DEFAULT_CHUNK, where: Sequence[Any] = ()
+) -> AsyncIterator[str]:
+    """The table (rows matching `where`) as NDJSON / CSV text, one chunk of rows at a time, in id order."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}; choose from {', '.join(FORMATS)}")
+    async with AsyncSessionLocal() as db:
+        cursor = None
+        first = True
+        while True:
+            page = await keyset_page(db, model, fields, chunk_size, cursor, where=where)
+            if page.rows or (first and fmt == "csv"):
+                yield _encode(page.rows, fmt, fields, header=first)
+            first = False
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
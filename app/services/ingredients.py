@@ -0,0 +1,152 @@
+# apps/api/app/services/ingredients.py
+"""
+Normalized recipe ingredients: the ingredients / recipe_ingredients tables.
+
+Recipe.ingredients stays the source text. Each recipe is mirrored into one
+recipe_ingredients row per distinct ingredient. That lets membership
+questions ("which recipes use X", "how many pantry items does each recipe
+use") run as indexed SQL instead of splitting every row in Python.
+
+An ingredient's name is the food its line names, without the amount
+("150g rice" -> "rice"). The amount goes to the grams/unit columns. Names
+are lowercase and stripped, like pantry names, so the two compare
+directly.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Sequence, Set
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.db.models import Ingredient, Recipe, RecipeIngredient
+from app.services.nutrition import quantity_grams
+from app.services.quantities import parse_line
+
+
+def ingredient_name(line: str) -> str:
+    """The food a line names: "150g Rice" -> "rice", "2 eggs" -> "eggs" (the line itself if it is only an amount)."""
+    name = line.strip().lower()
+    # repeat until no amount is left ("2 x 3 eggs"), so a name maps to itself
+    while (food := parse_line(name).food.strip()) and food != name:
+        name = food
+    return name
+
+
+def ingredient_lines(raw: str) -> Dict[str, str]:
+    """Comma-separated text -> {name: first line naming it}, in order."""
+    seen: Dict[str, str] = {}
+    for part in (raw or "").split(","):
+        line = part.strip().lower()
+        if line:
+            seen.setdefault(ingredient_name(line), line)
+    return seen
+
+
+def split_ingredients(raw: str) -> List[str]:
+    """Comma-separated text -> normalized names, in order, without duplicates."""
+    return list(ingredient_lines(raw))
+
+
+def ingredient_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """name -> ingredients.id, inserting names that are not in the table yet."""
+    wanted = set(names)
+    if not wanted:
+        return {}
+    ids = dict(db.query(Ingredient.name, Ingredient.id).filter(Ingredient.name.in_(wanted)).all())
+    missing = [Ingredient(name=n) for n in sorted(wanted - ids.keys())]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        ids.update((i.name, i.id) for i in missing)
+    return ids
+
+
+def sync_recipe_ingredients(db: Session, recipes: Sequence[Recipe]) -> None:
+    """Rewrite the recipe_ingredients rows of recipes from their text. Caller commits."""
+    parsed = {r.id: ingredient_lines(r.ingredients) for r in recipes}
+    ids = ingredient_ids(db, (n for names in parsed.values() for n in names))
+    db.query(RecipeIngredient).filter(RecipeIngredient.recipe_id.in_(parsed)).delete(synchronize_session=False)
+    rows = [
+        {"recipe_id": rid, "ingredient_id": ids[name], "position": pos, **_amount(line)}
+        for rid, names in parsed.items()
+        for pos, (name, line) in enumerate(names.items())
+    ]
+    if rows:
+        # one Core executemany; the ORM bulk path splits rows by which columns are NULL
+        db.execute(insert(RecipeIngredient.__table__), rows)
+
+
+def _amount(line: str) -> Dict[str, object]:
+    """grams/unit columns for one ingredient line; both None when it states no quantity."""
+    q = parse_line(line)
+    if q.quantity is None:
+        return {"grams": None, "unit": None}
+    return {"grams": quantity_grams(line), "unit": q.unit or "piece"}
+
+
+def backfill_recipe_ingredients(db: Session, batch_size: int = 500) -> int:
+    """
+    Populate recipe_ingredients for recipes that have ingredient text but no
+    rows yet. Recipes linked to names from before names dropped their
+    amounts ("150g rice") are rewritten too. Runs in committed batches and
+    is safe to re-run. Returns the number of recipes filled in.
+    """
+    done = _rename_stale(db, batch_size)
+    linked = db.query(RecipeIngredient.recipe_id).filter(RecipeIngredient.recipe_id == Recipe.id).exists()
+    last_id = 0
+    while True:
+        batch = (
+            db.query(Recipe)
+            .filter(Recipe.id > last_id, Recipe.ingredients.isnot(None), Recipe.ingredients != "", ~linked)
+            .order_by(Recipe.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return done
+        sync_recipe_ingredients(db, batch)
+        db.commit()
+        done += len(batch)
+        last_id = batch[-1].id
+
+
+def _rename_stale(db: Session, batch_size: int) -> int:
+    """Re-sync recipes using ingredient names that ingredient_name() would now shorten; drop the old names."""
+    stale = [i for i, name in db.query(Ingredient.id, Ingredient.name) if ingredient_name(name) != name]
+    if not stale:
+        return 0
+    recipe_ids = sorted(
+        {rid for (rid,) in db.query(RecipeIngredient.recipe_id).filter(RecipeIngredient.ingredient_id.in_(stale)).distinct()}
+    )
+    for start in range(0, len(recipe_ids), batch_size):
+        sync_recipe_ingredients(db, db.query(Recipe).filter(Recipe.id.in_(recipe_ids[start:start + batch_size])).all())
+        db.commit()
+    used = db.query(RecipeIngredient.ingredient_id).filter(RecipeIngredient.ingredient_id == Ingredient.id).exists()
+    db.query(Ingredient).filter(Ingredient.id.in_(stale), ~used).delete(synchronize_session=False)
+    db.commit()
+    return len(recipe_ids)
+
+
+# ---------- Membership queries ----------
+def overlap_counts(db: Session, names: Iterable[str]) -> Dict[int, int]:
+    """recipe_id -> how many of names it uses; recipes using none are absent."""
+    wanted = {n.strip().lower() for n in names if n and n.strip()}
+    if not wanted:
+        return {}
+    rows = (
+        db.query(RecipeIngredient.recipe_id, func.count())
+        .join(Ingredient, Ingredient.id == RecipeIngredient.ingredient_id)
+        .filter(Ingredient.name.in_(wanted))
+        .group_by(RecipeIngredient.recipe_id)
+        .all()
+    )
+    return dict(rows)
+
+
+def recipe_ids_with_all(db: Session, names: Iterable[str]) -> Set[int]:
+    """Ids of recipes that use every one of names."""
+    wanted = {n.strip().lower() for n in names if n and n.strip()}
+    if not wanted:
+        return set()
+    return {rid for rid, n in overlap_counts(db, wanted).items() if n == len(wanted)}
@@ -0,0 +1,83 @@
+# apps/api/app/services/listing.py
+"""
+Keyset-paginated, column-projected listing for the /list endpoints.
+
+Pages are walked by primary key (`id > cursor` ascending, `id < cursor`
+descending). Each page is one index range scan however deep the client has
+paged, and memory is bounded by the page size. Rows come back as plain
+mappings of the requested columns, so no ORM objects or response models are
+built. The cursor for the next page is sent in the X-Next-Cursor header,
+and the header is absent on the last page.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, create_model
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass(frozen=True)
+class Page:
+    rows: List[Dict[str, Any]]
+    next_cursor: Optional[int]
+
+
+def projection_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """
+    The response schema of a `fields=` listing of model: id is always
+    present, and every other field is optional because unrequested fields
+    are left out.
+    """
+    optional = {name: (Optional[f.annotation], None) for name, f in model.model_fields.items() if name != "id"}
+    return create_model(f"{model.__name__}Fields", id=(int, ...), **optional)
+
+
+def select_fields(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """
+    Columns for a comma-separated `fields` parameter, in `allowed` order and
+    always including id. Empty means all of allowed. Raises ValueError on
+    unknown names.
+    """
+    if not fields or not fields.strip():
+        return list(allowed)
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted.difference(allowed)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}; choose from {', '.join(allowed)}")
+    wanted.add("id")
+    return [f for f in allowed if f in wanted]
+
+
+async def keyset_page(
+    db: AsyncSession,
+    model: Any,
+    fields: Sequence[str],
+    limit: int,
+    cursor: Optional[int] = None,
+    descending: bool = False,
+    where: Sequence[Any] = (),
+) -> Page:
+    """One page of `fields` from model's table (rows matching `where`), continuing after cursor (an id)."""
+    key = model.id
+    stmt = select(*(getattr(model, f) for f in fields)).where(*where)
+    if cursor is not None:
+        stmt = stmt.where(key < cursor if descending else key > cursor)
+    # one extra row tells whether another page exists
+    stmt = stmt.order_by(key.desc() if descending else key.asc()).limit(limit + 1)
+    rows = [dict(m) for m in (await db.execute(stmt)).mappings()]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return Page(rows, rows[-1]["id"])
+    return Page(rows, None)
+
+
+def page_response(page: Page) -> JSONResponse:
+    headers = {NEXT_CURSOR_HEADER: str(page.next_cursor)} if page.next_cursor is not None else None
+    return JSONResponse(jsonable_encoder(page.rows), headers=headers)
@@ -0,0 +1,212 @@
+# apps/api/app/services/macro_jobs.py
+"""
+Batched, resumable recompute of estimated recipe macros.
+
+A job walks the recipes in id order, in chunks. Each chunk is estimated in
+one estimate_macros_bulk call and written with one bulk_update_mappings.
+The job's cursor (last_recipe_id) and counters are committed in the same
+transaction. After a crash, a job resumes from its last committed chunk;
+main.py restarts unfinished jobs at startup.
+
+Only one runner works on a job at a time, across threads and processes.
+run_job first claims the job with a conditional UPDATE. The claim succeeds
+if the job is pending, or if it is running but its updated_at (bumped by
+every chunk) is older than LEASE_SECONDS, meaning its runner died.
+
+A recipe is recomputed when its macros are missing, or when they were
+estimated under another nutrition_version(). Macros entered by hand
+(macros_version NULL) are left alone unless the job is `full`. Macros the
+pre-versioning estimator wrote are stamped LEGACY_MACROS_VERSION when the
+column is added (app/db/migrations.py), so they count as stale.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_, true, update
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.db.models import MacroJob, Recipe
+from app.services.nutrition import estimate_macros_bulk, nutrition_version
+from app.services.recipe_index import recipe_index
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+UNFINISHED = ("pending", "running")
+LEASE_SECONDS = 120  # a running job whose updated_at is older than this has lost its runner
+
+_running: Dict[int, threading.Thread] = {}
+_running_lock = threading.Lock()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _needs_recompute(job: MacroJob):
+    if job.full:
+        return true()
+    return or_(
+        Recipe.calories.is_(None),
+        Recipe.protein.is_(None),
+        Recipe.carbs.is_(None),
+        Recipe.fat.is_(None),
+        Recipe.macros_version != job.nutrition_version,  # NULL (hand-entered) doesn't match
+    )
+
+
+def start_job(db: Session, full: bool = False) -> MacroJob:
+    """Create a job (or return the unfinished one for the same version and mode)."""
+    version = nutrition_version()
+    job = (
+        db.query(MacroJob)
+        .filter(MacroJob.status.in_(UNFINISHED), MacroJob.nutrition_version == version, MacroJob.full == full)
+        .order_by(MacroJob.id)
+        .first()
+    )
+    if job is not None:
+        return job
+    now = _now()
+    job = MacroJob(status="pending", full=full, nutrition_version=version, created_at=now, updated_at=now)
+    job.total = db.query(Recipe).filter(_needs_recompute(job)).count()
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _claim(db: Session, job_id: int) -> bool:
+    """Mark the job running for this caller; False if it is finished or another runner holds it."""
+    now = _now()
+    claimed = db.execute(
+        update(MacroJob)
+        .where(
+            MacroJob.id == job_id,
+            or_(
+                MacroJob.status == "pending",
+                and_(MacroJob.status == "running", MacroJob.updated_at < now - timedelta(seconds=LEASE_SECONDS)),
+            ),
+        )
+        .values(status="running", updated_at=now)
+    ).rowcount
+    db.commit()
+    return claimed == 1
+
+
+def run_job(job_id: int, chunk_size: int = CHUNK_SIZE) -> None:
+    """
+    Process a job to completion from its cursor, if it can be claimed. Uses
+    its own session; safe to call in a thread.
+    """
+    db = SessionLocal()
+    try:
+        if not _claim(db, job_id):
+            return
+        job = db.get(MacroJob, job_id)
+        if job.nutrition_version != nutrition_version():
+            job.status, job.error, job.updated_at = "failed", "nutrition version changed; start a new job", _now()
+            db.commit()
+            return
+        while _run_chunk(db, job, chunk_size):
+            pass
+        job.status, job.updated_at = "done", _now()
+        db.commit()
+        recipe_index.save_macros(db)
+    except Exception as e:
+        log.exception("macro job %s failed", job_id)
+        db.rollback()
+        job = db.get(MacroJob, job_id)
+        if job is not None:
+            job.status, job.error, job.updated_at = "failed", repr(e), _now()
+            db.commit()
+    finally:
+        db.close()
+
+
+def _run_chunk(db: Session, job: MacroJob, chunk_size: int) -> bool:
+    """Recompute one chunk in one transaction; False when nothing is left."""
+    rows = (
+        db.query(Recipe.id, Recipe.ingredients)
+        .filter(Recipe.id > job.last_recipe_id, _needs_recompute(job))
+        .order_by(Recipe.id)
+        .limit(chunk_size)
+        .all()
+    )
+    if not rows:
+        return False
+    mappings: List[Dict[str, Any]] = []
+    for r, est in zip(rows, estimate_macros_bulk(r.ingredients or "" for r in rows)):
+        if sum(est.values()) == 0:
+            continue
+        mappings.append({"id": r.id, **est, "macros_version": job.nutrition_version})
+    if mappings:
+        db.bulk_update_mappings(Recipe, mappings)
+    job.last_recipe_id = rows[-1].id
+    job.processed += len(rows)
+    job.updated += len(mappings)
+    job.updated_at = _now()
+    db.commit()
+    if mappings:
+        recipe_index.upsert_many(db.query(Recipe).filter(Recipe.id.in_([m["id"] for m in mappings])).all())
+    return True
+
+
+def submit(job_id: int) -> threading.Thread:
+    """
+    Run a job in a background thread, or return the thread already running
+    it in this process. The thread exits at once if another process holds
+    the job.
+    """
+    with _running_lock:
+        t = _running.get(job_id)
+        if t is not None and t.is_alive():
+            return t
+        t = threading.Thread(target=_run_and_forget, args=(job_id,), name=f"macro-job-{job_id}", daemon=True)
+        _running[job_id] = t
+        t.start()
+        return t
+
+
+def _run_and_forget(job_id: int) -> None:
+    try:
+        run_job(job_id)
+    finally:
+        with _running_lock:
+            _running.pop(job_id, None)
+
+
+def resume_unfinished(db: Session) -> List[int]:
+    """
+    Restart jobs a previous process left pending/running; returns their ids.
+    A job still inside its lease is left to its runner. If that runner
+    crashed, the next startup or POST after the lease expires takes it over.
+    """
+    ids = [j.id for j in db.query(MacroJob.id).filter(MacroJob.status.in_(UNFINISHED)).order_by(MacroJob.id)]
+    for job_id in ids:
+        submit(job_id)
+    return ids
+
+
+def job_status(job: MacroJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "full": job.full,
+        "nutrition_version": job.nutrition_version,
+        "total": job.total,
+        "processed": job.processed,
+        "updated": job.updated,
+        "progress": round(job.processed / job.total, 3) if job.total else (1.0 if job.status == "done" else 0.0),
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+def get_job(db: Session, job_id: int) -> Optional[MacroJob]:
+    return db.get(MacroJob, job_id)
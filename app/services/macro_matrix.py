@@ -0,0 +1,163 @@
+# apps/api/app/services/macro_matrix.py
+"""
+Dense per-recipe macro matrix: recipe id -> float32 (calories, protein, carbs, fat).
+
+It is resolved once, from the DB columns when all four are set and from
+the estimator otherwise. It is kept in sync on recipe writes and persisted
+next to the database, so a restart doesn't re-estimate anything. A saved
+matrix is only reused when its nutrition_version() and a catalog
+signature (row count, max id, plain and id-weighted column sums, and a
+hash of the ingredients) still match the DB; otherwise it is rebuilt.
+
+Arrays are replaced on write, never mutated, so readers holding a
+reference see a consistent matrix.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from itertools import batched
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Recipe
+from app.services.nutrition import estimate_macros_bulk, nutrition_version
+
+log = logging.getLogger(__name__)
+
+MACRO_COLUMNS = ("calories", "protein", "carbs", "fat")
+
+
+def _text_checksum(texts: Iterable[Optional[str]]) -> float:
+    """48-bit hash of texts in order, as a float (48 bits fit a float64 exactly)."""
+    h = hashlib.blake2b(digest_size=6)
+    for chunk in batched(texts, 10000):
+        h.update("\x1f".join("\x00" if t is None else t for t in chunk).encode("utf-8"))
+    return float(int.from_bytes(h.digest(), "big"))
+
+
+def _signature(db: Session, rows: Optional[Sequence[Recipe]] = None) -> List[float]:
+    """
+    Count, max id, column sums, id-weighted macro sums (so two recipes
+    trading values or a NULL becoming 0 shows) and a hash of every
+    ingredients string (so a same-length edit shows). The hash reads rows
+    when the caller already has every recipe loaded in id order (startup),
+    and otherwise streams the column (saves after writes, which are rare).
+    """
+    row = db.query(
+        func.count(Recipe.id),
+        func.max(Recipe.id),
+        *(func.coalesce(func.sum(getattr(Recipe, c)), 0) for c in MACRO_COLUMNS),
+        *(func.coalesce(func.sum(Recipe.id * func.coalesce(getattr(Recipe, c), -1)), 0) for c in MACRO_COLUMNS),
+        func.coalesce(func.sum(func.length(Recipe.ingredients)), 0),
+    ).one()
+    if rows is not None:
+        texts = (r.ingredients for r in rows)
+    else:
+        stmt = select(Recipe.ingredients).order_by(Recipe.id)
+        texts = db.execute(stmt, execution_options={"yield_per": 10000}).scalars()
+    return [float(v or 0) for v in row] + [_text_checksum(texts)]
+
+
+def resolve_macros(rows: Sequence[Recipe]) -> np.ndarray:
+    """float32 (len(rows), 4): DB macros where complete, one bulk estimate for the rest."""
+    out = np.zeros((len(rows), len(MACRO_COLUMNS)), dtype=np.float32)
+    missing: List[int] = []
+    for i, r in enumerate(rows):
+        vals = [getattr(r, c) for c in MACRO_COLUMNS]
+        if None in vals:
+            missing.append(i)
+        else:
+            out[i] = [int(v or 0) for v in vals]
+    if missing:
+        for i, est in zip(missing, estimate_macros_bulk(rows[i].ingredients or "" for i in missing)):
+            out[i] = [est[c] for c in MACRO_COLUMNS]
+    return out
+
+
+class MacroMatrix:
+    def __init__(self, ids: Optional[np.ndarray] = None, values: Optional[np.ndarray] = None) -> None:
+        self.ids = ids if ids is not None else np.zeros(0, dtype=np.int64)  # sorted
+        self.values = values if values is not None else np.zeros((0, len(MACRO_COLUMNS)), dtype=np.float32)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Recipe]) -> "MacroMatrix":
+        ids = np.fromiter((r.id for r in rows), dtype=np.int64, count=len(rows))
+        values = resolve_macros(rows)
+        order = np.argsort(ids, kind="stable")
+        return cls(ids[order], values[order])
+
+    # ---------- persistence ----------
+    def save(self, path: str, db: Session, rows: Optional[Sequence[Recipe]] = None) -> None:
+        """rows, if given, are every recipe in id order (see _signature)."""
+        tmp = f"{path}.tmp.npz"
+        np.savez(
+            tmp,
+            ids=self.ids,
+            values=self.values,
+            version=np.array(nutrition_version()),
+            signature=np.array(_signature(db, rows), dtype=np.float64),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, db: Session, rows: Optional[Sequence[Recipe]] = None) -> Optional["MacroMatrix"]:
+        """The saved matrix, or None when it is missing, unreadable or stale. rows as for save()."""
+        try:
+            with np.load(path) as f:
+                if str(f["version"]) != nutrition_version():
+                    return None
+                if not np.array_equal(f["signature"], np.array(_signature(db, rows), dtype=np.float64)):
+                    return None
+                return cls(f["ids"], f["values"])
+        except (OSError, KeyError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                log.warning("ignoring macro matrix at %s: %r", path, e)
+            return None
+
+    # ---------- reads ----------
+    def rows_for(self, ids: np.ndarray) -> np.ndarray:
+        """Row of each id in self.values; -1 where unknown."""
+        ids = np.asarray(ids, dtype=np.int64)
+        pos = np.searchsorted(self.ids, ids)
+        pos = np.minimum(pos, max(len(self.ids) - 1, 0))
+        hit = (self.ids[pos] == ids) if len(self.ids) else np.zeros(len(ids), dtype=bool)
+        return np.where(hit, pos, -1)
+
+    def gather(self, ids: np.ndarray) -> np.ndarray:
+        """(len(ids), 4) macros for ids (zeros for unknown ids)."""
+        rows = self.rows_for(ids)
+        out = self.values[np.maximum(rows, 0)] if len(self.values) else np.zeros((len(rows), len(MACRO_COLUMNS)), np.float32)
+        out[rows < 0] = 0
+        return out
+
+    # ---------- writes (copy-on-write) ----------
+    def upsert(self, ids: Iterable[int], values: np.ndarray) -> "MacroMatrix":
+        new_ids = np.asarray(list(ids), dtype=np.int64)
+        keep = ~np.isin(self.ids, new_ids)
+        all_ids = np.concatenate([self.ids[keep], new_ids])
+        all_values = np.concatenate([self.values[keep], np.asarray(values, dtype=np.float32)])
+        order = np.argsort(all_ids, kind="stable")
+        return MacroMatrix(all_ids[order], all_values[order])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def load_or_build(db: Session, rows: Sequence[Recipe], path: Optional[str]) -> Tuple[MacroMatrix, bool]:
+    """
+    (matrix, loaded_from_disk) for rows, every recipe in id order. Builds
+    from rows, and saves, when no valid saved matrix exists.
+    """
+    if path:
+        m = MacroMatrix.load(path, db, rows)
+        if m is not None and len(m) == len(rows):
+            return m, True
+    m = MacroMatrix.from_rows(rows)
+    if path:
+        m.save(path, db, rows)
+    return m, False
@@ -0,0 +1,119 @@
+# apps/api/app/services/nutrient_store.py
+"""
+Columnar per-100g nutrient store.
+
+A store is a directory with three files:
+
+    names.npy   sorted, normalized food names as fixed-width UTF-8 bytes
+    values.npy  float32 matrix, one row per name, one column per nutrient
+    meta.json   {"columns": [...], "max_words": n}
+
+Opening a store memory-maps both arrays, so nothing is parsed into Python
+objects. The one full pass is digest(), which nutrition_version() takes
+once per dataset (about 120 ms per million foods). A name is found by
+binary search over names.npy (np.searchsorted). Missing values are NaN.
+
+Build one from a CSV or JSON dataset with app/scripts/load_nutrition.py.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+MACROS = ("calories", "protein", "carbs", "fat")
+GRAMS = "grams"  # optional column: default portion in grams when a recipe gives none
+
+_TOKEN = re.compile(r"[a-z]+")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase words joined by single spaces; the form both the store and the matcher use."""
+    return " ".join(_TOKEN.findall(name.lower()))
+
+
+class NutrientStore:
+    def __init__(self, names: np.ndarray, values: np.ndarray, columns: Sequence[str], max_words: int) -> None:
+        self.names = names
+        self.values = values
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.max_words = max_words
+        self._col = {c: i for i, c in enumerate(self.columns)}
+
+    # ---------- building ----------
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, Mapping[str, float]]], columns: Sequence[str]) -> "NutrientStore":
+        """Build in memory from (name, {column: value}) pairs; the first record for a name wins."""
+        rows: Dict[str, List[float]] = {}
+        for raw, vals in records:
+            name = normalize_name(raw)
+            if name and name not in rows:
+                rows[name] = [_number(vals.get(c)) for c in columns]
+        order = sorted(rows)
+        encoded = [n.encode("utf-8") for n in order]
+        width = max((len(b) for b in encoded), default=1)
+        names = np.array(encoded, dtype=f"S{width}")
+        values = np.array([rows[n] for n in order], dtype=np.float32).reshape(len(order), len(columns))
+        max_words = max((n.count(" ") + 1 for n in order), default=1)
+        return cls(names, values, columns, max_words)
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "names.npy"), self.names)
+        np.save(os.path.join(path, "values.npy"), self.values)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"columns": list(self.columns), "max_words": self.max_words}, f)
+
+    @classmethod
+    def open(cls, path: str) -> "NutrientStore":
+        """Memory-map a saved store (read-only)."""
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        names = np.load(os.path.join(path, "names.npy"), mmap_mode="r")
+        values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+        return cls(names, values, meta["columns"], int(meta["max_words"]))
+
+    # ---------- lookups ----------
+    def row(self, name: str) -> int:
+        """Row of an already-normalized name, or -1."""
+        key = name.encode("utf-8")
+        if not key or len(key) > self.names.dtype.itemsize:
+            return -1
+        i = int(np.searchsorted(self.names, key))
+        return i if i < len(self.names) and self.names[i] == key else -1
+
+    def __contains__(self, name: str) -> bool:
+        return self.row(name) >= 0
+
+    def get(self, row: int, column: str, default: Optional[float] = None) -> Optional[float]:
+        """One value; default when the column is absent or the value is missing."""
+        i = self._col.get(column)
+        if i is None:
+            return default
+        v = float(self.values[row, i])
+        return default if v != v else v
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def digest(self) -> str:
+        """Hash of the columns, names and values, so any corrected value changes it."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps(self.columns).encode("utf-8"))
+        for a in (self.names, self.values):
+            h.update(str(a.dtype).encode() + str(a.shape).encode())
+            h.update(memoryview(np.ascontiguousarray(a)).cast("B"))
+        return h.hexdigest()
+
+
+def _number(v) -> float:
+    if v is None or v == "":
+        return float("nan")
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return float("nan")
@@ -1,6 +1,15 @@
 # apps/api/app/services/nutrition.py
 from __future__ import annotations
-from typing import Dict
+
+import hashlib
+import json
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.nutrient_store import GRAMS, NutrientStore
+from app.services.quantities import UNIT_GRAMS, ParsedLine, parse_line
 
 # Very small per-100g defaults (MVP). Extend as you go.
 NUTRITION_TABLE: Dict[str, Dict[str, float]] = {
@@ -20,6 +29,9 @@ NUTRITION_TABLE: Dict[str, Dict[str, float]] = {
     "milk":        {"calories": 60,  "protein": 3.2, "carbs": 5,   "fat": 3.3},
     "oil":         {"calories": 884, "protein": 0,   "carbs": 0,   "fat": 100},
     "soy":         {"calories": 446, "protein": 36,  "carbs": 30,  "fat": 20},
+    "soy sauce":     {"calories": 53,  "protein": 8.1, "carbs": 4.9, "fat": 0.6},
+    "olive oil":     {"calories": 884, "protein": 0,   "carbs": 0,   "fat": 100},
+    "peanut butter": {"calories": 588, "protein": 25,  "carbs": 20,  "fat": 50},
 }
 
 # MVP heuristic weights per ingredient mention when no grams are given.
@@ -28,25 +40,243 @@ DEFAULT_GRAMS = {
     "egg": 50, "rice": 150, "bread": 60, "butter": 10, "tomato": 100,
     "paneer": 120, "tofu": 120, "oats": 40, "chickpeas": 120, "cheese": 40,
     "maggi": 70, "peanut": 20, "curd": 200, "milk": 200, "oil": 10, "soy": 30,
+    "soy sauce": 15, "olive oil": 10, "peanut butter": 32,
 }
 
-def estimate_macros_from_string(ingredients_str: str) -> Dict[str, int]:
+# Grams per unit where a food's density or piece weight differs from the
+# generic quantities.UNIT_GRAMS. A counted piece ("2 eggs") otherwise weighs
+# DEFAULT_GRAMS.
+UNIT_GRAMS_BY_FOOD: Dict[Tuple[str, str], float] = {
+    ("oil", "tbsp"): 13.6, ("olive oil", "tbsp"): 13.5, ("butter", "tbsp"): 14.2,
+    ("peanut butter", "tbsp"): 16, ("soy sauce", "tbsp"): 16,
+    ("oil", "tsp"): 4.5, ("olive oil", "tsp"): 4.5, ("butter", "tsp"): 4.7,
+    ("rice", "cup"): 185, ("oats", "cup"): 80, ("chickpeas", "cup"): 164,
+    ("cheese", "cup"): 113, ("paneer", "cup"): 150, ("milk", "cup"): 245, ("curd", "cup"): 245,
+    ("bread", "piece"): 30, ("cheese", "piece"): 20, ("tofu", "piece"): 80,
+}
+
+# Other names for table entries. Plurals ("eggs", "tomatoes") are derived
+# automatically and need no entry here.
+ALIASES: Dict[str, str] = {
+    "eggs": "egg",
+    "chick peas": "chickpeas", "chana": "chickpeas", "garbanzo": "chickpeas",
+    "yogurt": "curd", "yoghurt": "curd", "dahi": "curd",
+    "oat": "oats", "rolled oats": "oats",
+    "cottage cheese": "paneer",
+    "groundnut": "peanut",
+    "soya": "soy", "soya sauce": "soy sauce", "soy chunks": "soy",
+    "extra virgin olive oil": "olive oil",
+}
+
+_TOKEN = re.compile(r"[a-z]+")
+_END = ""  # trie key marking "a table entry ends here"
+
+
+def _variants(name: str) -> List[str]:
+    """name plus singular/plural forms of its last word."""
+    head, _, last = name.rpartition(" ")
+    forms = {last, last + "s", last + "es"}
+    if last.endswith("es"):
+        forms.add(last[:-2])
+    if last.endswith("s"):
+        forms.add(last[:-1])
+    return [f"{head} {f}" if head else f for f in forms if f]
+
+
+def _compile(table: Iterable[str], aliases: Dict[str, str]) -> Dict[str, dict]:
+    """Token trie over every table name, alias and plural form -> canonical table key."""
+    trie: Dict[str, dict] = {}
+    names = [(n, n) for n in table] + list(aliases.items())
+    for surface, key in names:
+        for form in _variants(surface):
+            node = trie
+            for tok in form.split():
+                node = node.setdefault(tok, {})
+            # exact table names win over derived forms of other entries
+            if node.get(_END) is None or form == key:
+                node[_END] = key
+    return trie
+
+
+_TRIE = _compile(NUTRITION_TABLE, ALIASES)
+
+# Optional large food-composition dataset (see app/services/nutrient_store.py),
+# consulted alongside the table above. Memory-mapped, so opening it is cheap.
+_dataset: Optional[NutrientStore] = None
+_version = ""
+
+
+def nutrition_version() -> str:
     """
-    Very rough estimator: splits on commas, maps tokens to known ingredients,
-    applies DEFAULT_GRAMS, sums per-100g values.
-    Returns rounded ints (calories, protein, carbs, fat).
+    Fingerprint of everything estimates depend on: the tables, aliases, unit
+    conversions and the dataset in use. Stored estimates from another version
+    are stale.
+    """
+    return _version
+
+
+def _fingerprint() -> str:
+    blob = json.dumps(
+        {
+            "table": NUTRITION_TABLE,
+            "grams": DEFAULT_GRAMS,
+            "aliases": ALIASES,
+            "units": UNIT_GRAMS,
+            "units_by_food": sorted([*k, v] for k, v in UNIT_GRAMS_BY_FOOD.items()),
+            "dataset": _dataset.digest() if _dataset else None,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def use_dataset(path: Optional[str]) -> None:
+    """Switch to the nutrient store saved at path (None: table only) and drop memoized results."""
+    global _dataset, _version
+    _dataset = NutrientStore.open(path) if path else None
+    _version = _fingerprint()
+    for fn in (match_ingredient, _part_macros, _line_grams, _estimate):
+        fn.cache_clear()
+
+
+def _dataset_match(toks: List[str], i: int) -> Tuple[int, Optional[str]]:
+    """Longest dataset name starting at toks[i] (last word singular or plural) -> (words, name)."""
+    store = _dataset
+    for n in range(min(store.max_words, len(toks) - i), 0, -1):
+        phrase = " ".join(toks[i:i + n])
+        for form in (phrase, *sorted(_variants(phrase), key=len)):
+            if form in store:
+                return n, form
+    return 0, None
+
+
+@lru_cache(maxsize=16384)
+def match_ingredient(part: str) -> Optional[str]:
     """
-    parts = [p.strip().lower() for p in (ingredients_str or "").split(",") if p.strip()]
-    totals = {"calories": 0.0, "protein": 0.0, "carbs": 0.0, "fat": 0.0}
-    for p in parts:
-        name = p.split()[0]  # first token as key (e.g., "egg", "rice")
-        if name not in NUTRITION_TABLE:
+    Table (or dataset) key for one ingredient mention, or None.
+
+    Leftmost-longest match over word tokens: "olive oil" is olive oil rather
+    than oil, "2 boiled eggs" is egg, "peanut butter" is not plain butter.
+    On equal length the curated table wins over the dataset.
+    """
+    toks = _TOKEN.findall(part.lower())
+    for i in range(len(toks)):
+        node, found, length = _TRIE, None, 0
+        for n, tok in enumerate(toks[i:], 1):
+            node = node.get(tok)
+            if node is None:
+                break
+            if _END in node:
+                found, length = node[_END], n
+        if _dataset is not None:
+            n, name = _dataset_match(toks, i)
+            if n > length:
+                found = name
+        if found is not None:
+            return found
+    return None
+
+
+def _grams(name: str, parsed: ParsedLine) -> float:
+    """Weight of one mention of food name; DEFAULT_GRAMS (or the dataset's portion) when no quantity is given."""
+    if name in NUTRITION_TABLE:
+        default = DEFAULT_GRAMS.get(name, 100)
+    else:
+        default = _dataset.get(_dataset.row(name), GRAMS, 100.0)
+    if parsed.quantity is None:
+        return default
+    unit = parsed.unit or "piece"
+    per = UNIT_GRAMS_BY_FOOD.get((name, unit)) or UNIT_GRAMS.get(unit) or default
+    return parsed.quantity * per
+
+
+@lru_cache(maxsize=16384)
+def _line_grams(part: str) -> Tuple[Optional[str], float]:
+    parsed = parse_line(part)
+    name = match_ingredient(parsed.food)
+    return name, (_grams(name, parsed) if name is not None else 0.0)
+
+
+@lru_cache(maxsize=16384)
+def _part_macros(part: str) -> Optional[Tuple[float, float, float, float]]:
+    name, grams = _line_grams(part)
+    if name is None:
+        return None
+    factor = grams / 100.0
+    macro = NUTRITION_TABLE.get(name)
+    if macro is not None:
+        return (macro["calories"] * factor, macro["protein"] * factor, macro["carbs"] * factor, macro["fat"] * factor)
+    row = _dataset.row(name)
+    return tuple(_dataset.get(row, c, 0.0) * factor for c in ("calories", "protein", "carbs", "fat"))
+
+
+def quantity_grams(line: str) -> Optional[float]:
+    """Grams a line states ("150g rice", "2 eggs", "1 tbsp oil"), or None when it gives no usable quantity."""
+    parsed = parse_line(line)
+    if parsed.quantity is None:
+        return None
+    name = match_ingredient(parsed.food)
+    if name is not None:
+        return _grams(name, parsed)
+    per = UNIT_GRAMS.get(parsed.unit or "")
+    return parsed.quantity * per if per else None
+
+
+@lru_cache(maxsize=4096)
+def _estimate(normalized: Tuple[str, ...]) -> Tuple[int, int, int, int]:
+    cal = protein = carbs = fat = 0.0
+    for part in normalized:
+        m = _part_macros(part)
+        if m is None:
             continue
-        grams = DEFAULT_GRAMS.get(name, 100)
-        factor = grams / 100.0
-        macro = NUTRITION_TABLE[name]
-        totals["calories"] += macro["calories"] * factor
-        totals["protein"]  += macro["protein"]  * factor
-        totals["carbs"]    += macro["carbs"]    * factor
-        totals["fat"]      += macro["fat"]      * factor
-    return {k: int(round(v)) for k, v in totals.items()}
+        cal += m[0]
+        protein += m[1]
+        carbs += m[2]
+        fat += m[3]
+    return int(round(cal)), int(round(protein)), int(round(carbs)), int(round(fat))
+
+
+def _normalize(ingredients_str: str) -> Tuple[str, ...]:
+    return tuple(p.strip().lower() for p in (ingredients_str or "").split(",") if p.strip())
+
+def estimate_macros_from_string(ingredients_str: str) -> Dict[str, int]:
+    """
+    Rough estimator: splits on commas, parses each part's quantity and unit
+    ("150g rice", "2 eggs", "1 tbsp oil"), maps the rest to a known
+    ingredient (match_ingredient), converts to grams (DEFAULT_GRAMS when no
+    quantity is given), and sums per-100g values.
+    Returns rounded ints (calories, protein, carbs, fat). Memoized per
+    normalized string.
+    """
+    cal, protein, carbs, fat = _estimate(_normalize(ingredients_str))
+    return {"calories": cal, "protein": protein, "carbs": carbs, "fat": fat}
+
+
+def estimate_macros_bulk(ingredient_strs: Iterable[str]) -> List[Dict[str, int]]:
+    """estimate_macros_from_string for a whole catalog; each distinct string is computed once."""
+    done: Dict[Tuple[str, ...], Tuple[int, int, int, int]] = {}
+    out: List[Dict[str, int]] = []
+    for s in ingredient_strs:
+        key = _normalize(s)
+        est = done.get(key)
+        if est is None:
+            est = done[key] = _estimate(key)
+        out.append({"calories": est[0], "protein": est[1], "carbs": est[2], "fat": est[3]})
+    return out
+
+
+def cache_info() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counters of the memoized matcher and estimator."""
+    return {
+        name: fn.cache_info()._asdict()
+        for name, fn in (
+            ("parse", parse_line),
+            ("match", match_ingredient),
+            ("part", _part_macros),
+            ("estimate", _estimate),
+        )
+    }
+
+
+use_dataset(get_settings().NUTRITION_STORE_PATH)
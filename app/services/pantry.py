@@ -0,0 +1,283 @@
+# apps/api/app/services/pantry.py
+"""
+Per-owner pantry: batch mutations, expiry queries and the name cache.
+
+Every query here is scoped to one owner (household, see app.core.owner)
+and served by the (owner_id, ...) indexes on pantry_items.
+
+apply_batch runs deletes, then updates, then adds, as one transaction. An
+add whose normalized name (the form recipe ingredients are matched in)
+matches an existing item, or an earlier add in the same batch, is merged
+into it rather than inserted:
+  - quantities are summed,
+  - the existing unit is kept,
+  - the earlier expiry date is kept.
+
+Expiry lookups are range scans on (owner_id, expiry_date), so they touch
+only the owner's items inside the window.
+
+Ranking needs each owner's set of normalized pantry names on every call.
+pantry_cache keeps those sets in memory. Every pantry write made through
+this process invalidates the owner's entry, and entries are reloaded after
+PANTRY_CACHE_TTL_SECONDS to pick up writes from other processes. A
+per-owner version stops a read that raced a write from caching the stale
+set, and it keys the suggest/search result cache.
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.models import PantryItem
+from app.schemas.pantry import PantryCreate, PantryOut, PantryUpdate
+
+
+class UnknownPantryItems(LookupError):
+    def __init__(self, ids: Sequence[int]) -> None:
+        super().__init__(f"unknown pantry item ids: {', '.join(map(str, ids))}")
+        self.ids = list(ids)
+
+
+def normalize_pantry_name(name: str) -> str:
+    """Same normalization as split_ingredients, so merged names still match recipes."""
+    return (name or "").strip().lower()
+
+
+@dataclass
+class BatchResult:
+    added: List[PantryOut] = field(default_factory=list)
+    merged: List[PantryOut] = field(default_factory=list)
+    updated: List[PantryOut] = field(default_factory=list)
+    deleted: List[int] = field(default_factory=list)
+
+
+def _earliest(a: Optional[date], b: Optional[date]) -> Optional[date]:
+    return min(d for d in (a, b) if d is not None) if (a or b) else None
+
+
+# ---------- name cache ----------
+@dataclass
+class _Entry:
+    version: int
+    rows: Optional[FrozenSet[Tuple[str, Optional[date]]]] = None  # (normalized name, expiry) pairs
+    names: FrozenSet[str] = frozenset()
+    loaded_at: float = 0.0
+
+
+class PantryCache:
+    """
+    owner id -> the owner's normalized pantry names and a version, for at
+    most max_owners owners (least recently used evicted).
+
+    Writes made through this process call invalidate(). Writes made by
+    another process (another worker, the bulk_data CLI) are picked up when
+    the entry is older than ttl_seconds and gets reloaded. If the reload
+    finds different rows, the version moves on too. Versions come from one
+    process-wide counter, so an evicted owner never gets an old version
+    back.
+    """
+
+    def __init__(self, max_owners: int = 10000, ttl_seconds: float = 5.0) -> None:
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._clock = itertools.count(1)
+        self._max = max_owners
+        self.ttl = ttl_seconds
+
+    def _entry(self, owner_id: str) -> _Entry:
+        """The owner's entry, created if missing. Caller holds _lock."""
+        entry = self._entries.get(owner_id)
+        if entry is None:
+            entry = self._entries[owner_id] = _Entry(next(self._clock))
+            while len(self._entries) > self._max:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(owner_id)
+        return entry
+
+    def get(self, owner_id: str) -> Optional[Tuple[FrozenSet[str], int]]:
+        """(names, version) if loaded within ttl_seconds, else None."""
+        with self._lock:
+            entry = self._entries.get(owner_id)
+            if entry is None or entry.rows is None or time.monotonic() - entry.loaded_at > self.ttl:
+                return None
+            self._entries.move_to_end(owner_id)
+            return entry.names, entry.version
+
+    def version(self, owner_id: str) -> int:
+        """Read it before loading and pass it to put()."""
+        with self._lock:
+            return self._entry(owner_id).version
+
+    def put(self, owner_id: str, rows: FrozenSet[Tuple[str, Optional[date]]], version: int) -> int:
+        """Store freshly loaded rows; returns the owner's version now (bumped if the rows changed)."""
+        with self._lock:
+            entry = self._entry(owner_id)
+            if entry.version != version:
+                return entry.version  # a write landed while rows were loading
+            if entry.rows is not None and entry.rows != rows:
+                entry.version = next(self._clock)  # changed by another process
+            entry.rows = rows
+            entry.names = frozenset(name for name, _ in rows)
+            entry.loaded_at = time.monotonic()
+            return entry.version
+
+    def invalidate(self, owner_id: str) -> None:
+        with self._lock:
+            entry = self._entry(owner_id)
+            entry.version = next(self._clock)
+            entry.rows = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_settings = get_settings()
+pantry_cache = PantryCache(_settings.PANTRY_CACHE_MAX_OWNERS, _settings.PANTRY_CACHE_TTL_SECONDS)
+
+
+def _rows_query(owner_id: str) -> Select:
+    return select(PantryItem.name, PantryItem.expiry_date).where(PantryItem.owner_id == owner_id)
+
+
+def _row_set(rows: Iterable[Tuple[str, Optional[date]]]) -> FrozenSet[Tuple[str, Optional[date]]]:
+    return frozenset((n, d) for n, d in ((normalize_pantry_name(name), d) for name, d in rows) if n)
+
+
+def pantry_state(db: Session, owner_id: str) -> Tuple[FrozenSet[str], int]:
+    """The owner's normalized pantry names and their version, from pantry_cache when fresh."""
+    hit = pantry_cache.get(owner_id)
+    if hit is None:
+        version = pantry_cache.version(owner_id)
+        rows = _row_set(db.execute(_rows_query(owner_id)).all())
+        hit = frozenset(n for n, _ in rows), pantry_cache.put(owner_id, rows, version)
+    return hit
+
+
+async def pantry_state_async(db: AsyncSession, owner_id: str) -> Tuple[FrozenSet[str], int]:
+    """pantry_state for an AsyncSession."""
+    hit = pantry_cache.get(owner_id)
+    if hit is None:
+        version = pantry_cache.version(owner_id)
+        rows = _row_set((await db.execute(_rows_query(owner_id))).all())
+        hit = frozenset(n for n, _ in rows), pantry_cache.put(owner_id, rows, version)
+    return hit
+
+
+def pantry_names(db: Session, owner_id: str) -> FrozenSet[str]:
+    """The owner's normalized pantry names, from pantry_cache when fresh."""
+    return pantry_state(db, owner_id)[0]
+
+
+# ---------- batch mutations ----------
+def apply_batch(
+    db: Session, owner_id: str, add: Sequence[PantryCreate], update: Sequence[PantryUpdate], delete: Sequence[int]
+) -> BatchResult:
+    """
+    Apply one batch to owner_id's pantry and commit, or change nothing.
+    Raises UnknownPantryItems if an update/delete id is not one of the
+    owner's items. Raises ValueError if an id is both updated and deleted,
+    if an added name is empty, or if an update blanks a name or nulls
+    quantity/unit (only expiry_date may be cleared).
+    """
+    if any(not normalize_pantry_name(a.name) for a in add):
+        raise ValueError("pantry item name must not be empty")
+    for u in update:
+        sent = u.model_dump(exclude_unset=True, exclude={"id"})
+        if "name" in sent and not normalize_pantry_name(sent["name"] or ""):
+            raise ValueError(f"pantry item {u.id}: name must not be empty")
+        nulled = [key for key in ("quantity", "unit") if key in sent and sent[key] is None]
+        if nulled:
+            raise ValueError(f"pantry item {u.id}: {', '.join(nulled)} must not be null")
+    delete_ids = set(delete)
+    update_ids = {u.id for u in update}
+    both = delete_ids & update_ids
+    if both:
+        raise ValueError(f"pantry items both updated and deleted: {', '.join(map(str, sorted(both)))}")
+    wanted = delete_ids | update_ids
+    items: Dict[int, PantryItem] = {}
+    if wanted:
+        items = {
+            p.id: p
+            for p in db.query(PantryItem).filter(PantryItem.owner_id == owner_id, PantryItem.id.in_(wanted)).all()
+        }
+    missing = sorted(wanted - items.keys())
+    if missing:
+        raise UnknownPantryItems(missing)
+
+    result = BatchResult()
+    for item_id in sorted(delete_ids):
+        db.delete(items[item_id])
+        result.deleted.append(item_id)
+
+    updated: Dict[int, PantryItem] = {}
+    for u in update:
+        item = items[u.id]
+        for key, value in u.model_dump(exclude_unset=True, exclude={"id"}).items():
+            setattr(item, key, normalize_pantry_name(value) if key == "name" else value)
+        updated[item.id] = item
+
+    # one lookup for every name the adds touch; the oldest item wins when the pantry already has duplicates
+    keys = {normalize_pantry_name(a.name) for a in add}
+    by_name: Dict[str, PantryItem] = {}
+    merged: Dict[int, PantryItem] = {}
+    new: List[PantryItem] = []
+    if keys:
+        norm = func.lower(func.trim(PantryItem.name))
+        for p in db.query(PantryItem).filter(PantryItem.owner_id == owner_id, norm.in_(keys)).order_by(PantryItem.id).all():
+            if p.id not in delete_ids:
+                by_name.setdefault(normalize_pantry_name(p.name), p)
+    # items renamed by this batch's updates (not flushed, so the query above can't see them)
+    for item in updated.values():
+        if item.name in keys:
+            by_name.setdefault(item.name, item)
+    for a in add:
+        key = normalize_pantry_name(a.name)
+        item = by_name.get(key)
+        if item is None:
+            item = PantryItem(owner_id=owner_id, name=key, quantity=a.quantity, unit=a.unit, expiry_date=a.expiry_date)
+            db.add(item)
+            new.append(item)
+            by_name[key] = item
+            continue
+        item.quantity = (item.quantity or 0) + a.quantity
+        item.expiry_date = _earliest(item.expiry_date, a.expiry_date)
+        if item.id is not None and item.id not in updated:
+            merged[item.id] = item
+
+    db.flush()
+    # serialize before commit, so nothing is reloaded afterwards
+    result.added = [PantryOut.model_validate(p) for p in new]
+    result.merged = [PantryOut.model_validate(p) for p in merged.values()]
+    result.updated = [PantryOut.model_validate(p) for p in updated.values()]
+    db.commit()
+    pantry_cache.invalidate(owner_id)
+    return result
+
+
+# ---------- expiry ----------
+def expiring_query(owner_id: str, days: int, today: Optional[date] = None, include_expired: bool = False) -> Select:
+    """owner_id's items whose expiry_date falls within `days` days of today, soonest first."""
+    today = today or date.today()
+    stmt = select(PantryItem).where(
+        PantryItem.owner_id == owner_id, PantryItem.expiry_date <= today + timedelta(days=days)
+    )
+    if not include_expired:
+        stmt = stmt.where(PantryItem.expiry_date >= today)
+    return stmt.order_by(PantryItem.expiry_date, PantryItem.id)
+
+
+def expiring_names_query(owner_id: str, days: int, today: Optional[date] = None) -> Select:
+    """Distinct lowercase names of the items expiring_query returns (not yet expired)."""
+    inner = expiring_query(owner_id, days, today).with_only_columns(func.lower(func.trim(PantryItem.name))).order_by(None)
+    return inner.distinct()
@@ -0,0 +1,101 @@
+# apps/api/app/services/quantities.py
+"""
+Quantity/unit parsing for ingredient lines.
+
+    parse_line("150g rice")          -> ParsedLine(food="rice", quantity=150.0, unit="g")
+    parse_line("1 1/2 tbsp olive oil") -> ParsedLine(food="olive oil", quantity=1.5, unit="tbsp")
+    parse_line("2 eggs")             -> ParsedLine(food="eggs", quantity=2.0, unit=None)
+    parse_line("rice (200 g)")       -> ParsedLine(food="rice", quantity=200.0, unit="g")
+    parse_line("salt")               -> ParsedLine(food="salt", quantity=None, unit=None)
+
+A leading amount ("2", "1.5", "1/2", "1 1/2", "½", "2-3" = 2.5, "a") may be
+followed by a unit. A trailing metric amount ("rice 150g", "(150 g)") is
+also recognised. Units are canonicalised via UNIT_ALIASES. A quantity with
+unit None is a count of pieces. Turning pieces and volumes into grams
+depends on the food; app.services.nutrition does that. Both patterns are
+compiled once, and results are cached per line.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+
+# canonical unit -> spellings
+_UNITS: Dict[str, tuple] = {
+    "g": ("g", "gm", "gms", "gr", "gram", "grams", "gramme", "grammes"),
+    "kg": ("kg", "kgs", "kilo", "kilos", "kilogram", "kilograms"),
+    "mg": ("mg", "milligram", "milligrams"),
+    "oz": ("oz", "ounce", "ounces"),
+    "lb": ("lb", "lbs", "pound", "pounds"),
+    "ml": ("ml", "millilitre", "millilitres", "milliliter", "milliliters"),
+    "l": ("l", "litre", "litres", "liter", "liters"),
+    "tsp": ("tsp", "tsps", "teaspoon", "teaspoons"),
+    "tbsp": ("tbsp", "tbsps", "tbs", "tbl", "tablespoon", "tablespoons"),
+    "cup": ("cup", "cups"),
+    "piece": ("piece", "pieces", "pc", "pcs", "whole", "slice", "slices", "clove", "cloves"),
+    "pinch": ("pinch", "pinches"),
+    "handful": ("handful", "handfuls"),
+}
+UNIT_ALIASES: Dict[str, str] = {alias: unit for unit, aliases in _UNITS.items() for alias in aliases}
+
+# Grams per unit, taking 1 ml as 1 g. Foods whose density differs get
+# overrides in app.services.nutrition.UNIT_GRAMS_BY_FOOD. "piece" is not
+# listed here: it depends on the food.
+UNIT_GRAMS: Dict[str, float] = {
+    "g": 1.0, "kg": 1000.0, "mg": 0.001, "oz": 28.35, "lb": 453.59,
+    "ml": 1.0, "l": 1000.0, "tsp": 5.0, "tbsp": 15.0, "cup": 240.0,
+    "pinch": 0.5, "handful": 30.0,
+}
+
+_FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3, "⅛": 0.125}
+_NUM = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d*\.\d+|\d+\s*[½¼¾⅓⅔⅛]|\d+|[½¼¾⅓⅔⅛])"
+_UNIT = "|".join(sorted(map(re.escape, UNIT_ALIASES), key=len, reverse=True))
+
+_LEADING = re.compile(
+    rf"""^\s*
+    (?:(?P<num>{_NUM})(?:\s*(?:-|–|to)\s*(?P<num2>{_NUM}))?|(?P<a>an?)(?=\s+(?:{_UNIT})\b))
+    \s*(?:x\s+)?
+    (?:(?P<unit>{_UNIT})\.?(?![a-z]))?
+    \s*(?:of\s+)?(?P<food>.*)$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+_TRAILING = re.compile(
+    rf"^(?P<food>.*?)[\s,(]+(?P<num>{_NUM})\s*(?P<unit>g|kg|ml|l|oz|lb)\.?\)?\s*$",
+    re.IGNORECASE,
+)
+
+
+class ParsedLine(NamedTuple):
+    food: str
+    quantity: Optional[float]
+    unit: Optional[str]
+
+
+def _number(s: str) -> float:
+    s = s.strip()
+    if s[-1] in _FRACTIONS:
+        whole = s[:-1].strip()
+        return (float(whole) if whole else 0.0) + _FRACTIONS[s[-1]]
+    if "/" in s:
+        whole, _, frac = s.rpartition(" ")
+        num, den = frac.split("/")
+        return (float(whole) if whole else 0.0) + (float(num) / float(den) if float(den) else 0.0)
+    return float(s)
+
+
+@lru_cache(maxsize=16384)
+def parse_line(line: str) -> ParsedLine:
+    """Split one ingredient line into (food, quantity, unit); see the module docstring."""
+    text = line.strip().lower()
+    m = _LEADING.match(text)
+    if m and (m.group("num") or m.group("a")):
+        qty = 1.0 if m.group("a") else _number(m.group("num"))
+        if m.group("num2"):
+            qty = (qty + _number(m.group("num2"))) / 2
+        unit = m.group("unit")
+        return ParsedLine(m.group("food").strip(" ,.-"), qty, UNIT_ALIASES[unit] if unit else None)
+    m = _TRAILING.match(text)
+    if m and m.group("food").strip():
+        return ParsedLine(m.group("food").strip(" ,.-"), _number(m.group("num")), UNIT_ALIASES[m.group("unit")])
+    return ParsedLine(text, None, None)
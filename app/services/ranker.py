@@ -1,4 +1,7 @@
-from typing import Dict
+import heapq
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
 
 def nutrition_fit(macros: Dict[str, int], target_protein: int = 30, calorie_cap: int = 600) -> float:
     """Return 0..1 based on hitting protein target and staying under calorie cap."""
@@ -19,3 +22,108 @@ def time_fit(time_minutes: int, max_time: int) -> float:
 def final_score(ing: float, t: float, nut: float) -> float:
     # weights: ingredients 0.5, time 0.2, nutrition 0.3
     return round(0.5 * ing + 0.2 * t + 0.3 * nut, 4)
+
+
+# ---------- Batch (vectorized) scoring ----------
+# Same formulas as above, evaluated over columnar arrays for a whole candidate set.
+
+def round_batch(x: np.ndarray, ndigits: int) -> np.ndarray:
+    """np.round, except values sitting on a .5 boundary are rounded the way builtin round() does."""
+    out = np.round(x, ndigits)
+    scaled = x * 10.0 ** ndigits
+    edge = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if edge.any():
+        out[edge] = [round(float(v), ndigits) for v in x[edge]]
+    return out
+
+
+def ingredient_fit_batch(have: np.ndarray, n_ingredients: np.ndarray) -> np.ndarray:
+    """have / n_ingredients rounded to 3 places; 0.0 where a recipe has no ingredients."""
+    ratio = np.divide(have, n_ingredients, out=np.zeros(len(have)), where=n_ingredients > 0)
+    return round_batch(ratio, 3)
+
+
+EXPIRING_WEIGHT = 0.2  # extra score for a recipe made entirely of soon-to-expire pantry items
+
+
+def expiring_boost_batch(expiring: np.ndarray, n_ingredients: np.ndarray) -> np.ndarray:
+    """EXPIRING_WEIGHT * share of a recipe's ingredients that are pantry items about to expire."""
+    return round_batch(EXPIRING_WEIGHT * ingredient_fit_batch(expiring, n_ingredients), 4)
+
+
+def nutrition_fit_batch(protein: np.ndarray, calories: np.ndarray, target_protein: int = 30, calorie_cap: int = 600) -> np.ndarray:
+    p = np.asarray(protein, dtype=np.float64)
+    c = np.asarray(calories, dtype=np.float64)
+    c = np.where(c == 0, 10**9, c)  # mirrors `or 10**9` in nutrition_fit
+    protein_score = np.minimum(p / target_protein, 1.0)
+    calorie_score = np.where(c <= calorie_cap, 1.0, np.maximum(0.2, 1 - (c - calorie_cap) / 1000))
+    return round_batch(0.6 * protein_score + 0.4 * calorie_score, 3)
+
+
+def time_fit_batch(time_minutes: np.ndarray, max_time: int) -> np.ndarray:
+    """NaN marks an unknown time (scores 0.5, like None in time_fit)."""
+    t = np.asarray(time_minutes, dtype=np.float64)
+    decay = round_batch(np.maximum(0.0, 1 - (t - max_time) / max(10, max_time)), 3)
+    out = np.where(t <= max_time, 1.0, decay)
+    out[np.isnan(t)] = 0.5
+    return out
+
+
+def final_score_batch(ing: np.ndarray, t: np.ndarray, nut: np.ndarray) -> np.ndarray:
+    return round_batch(0.5 * ing + 0.2 * t + 0.3 * nut, 4)
+
+
+class TopK:
+    """Bounded min-heap of the k best (score, row) pairs; on equal scores the lower row wins."""
+
+    def __init__(self, k: int) -> None:
+        self.k = k
+        self._heap: List[Tuple[float, int]] = []
+
+    def full(self) -> bool:
+        return len(self._heap) >= self.k
+
+    def can_beat(self, bound: float) -> bool:
+        """False once nothing scoring <= bound could still enter the top k."""
+        return not self.full() or bound >= self._heap[0][0]
+
+    def push_many(self, scores: np.ndarray, rows: np.ndarray) -> None:
+        heap = self._heap
+        for s, row in zip(scores.tolist(), rows.tolist()):
+            item = (s, -row)
+            if len(heap) < self.k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    def rows(self) -> List[int]:
+        """Winning rows, best first."""
+        return [-neg_row for _, neg_row in sorted(self._heap, reverse=True)]
+
+
+def bounded_top_k(
+    k: int,
+    exact_rows: np.ndarray,
+    exact_scores: np.ndarray,
+    rest_rows: np.ndarray,
+    rest_bounds: np.ndarray,
+    score_rows: Callable[[np.ndarray], np.ndarray],
+    block: int = 256,
+) -> List[int]:
+    """
+    Top-k rows, best first, without scoring every row.
+
+    exact_rows are already scored. rest_rows must be ordered by descending
+    rest_bounds (an upper bound on each row's score); they are scored in
+    blocks via score_rows until a block's best bound can't beat the k-th score.
+    """
+    best = TopK(k)
+    if k <= 0:
+        return []
+    best.push_many(exact_scores, exact_rows)
+    for start in range(0, len(rest_rows), block):
+        if not best.can_beat(float(rest_bounds[start])):
+            break
+        rows = rest_rows[start:start + block]
+        best.push_many(score_rows(rows), rows)
+    return best.rows()
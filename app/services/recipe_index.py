@@ -0,0 +1,248 @@
+# apps/api/app/services/recipe_index.py
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.models import Recipe
+from app.services.ingredients import split_ingredients
+from app.services.macro_matrix import MACRO_COLUMNS, MacroMatrix, load_or_build, resolve_macros
+from app.services.ranker import nutrition_fit_batch
+from app.services.text_index import TextIndex
+
+
+def parse_ingredients(raw: str) -> Set[str]:
+    """MVP parser: split comma-separated ingredients to a lowercase set."""
+    return set(split_ingredients(raw))
+
+
+def _macros_dict(row: np.ndarray) -> Dict[str, int]:
+    return {c: int(v) for c, v in zip(MACRO_COLUMNS, row.tolist())}
+
+
+@dataclass(frozen=True)
+class IndexedRecipe:
+    """Everything the rankers need about one recipe, resolved once."""
+    id: int
+    title: str
+    ingredients: str
+    ingredient_set: FrozenSet[str]
+    macros: Dict[str, int]
+    time_minutes: Optional[int]
+
+
+@dataclass(frozen=True)
+class RecipeColumns:
+    """Columnar view of one snapshot for the batch scorers; row i describes entries[i]."""
+    entries: Tuple[IndexedRecipe, ...]
+    ids: np.ndarray
+    macros: np.ndarray  # float32 (n, 4): calories, protein, carbs, fat
+    protein: np.ndarray
+    calories: np.ndarray
+    time_minutes: np.ndarray  # missing/0 already defaulted to 15, as the endpoints do
+    n_ingredients: np.ndarray
+    nutrition: np.ndarray  # nutrition_fit at the default targets; static per recipe
+    by_nutrition: np.ndarray  # rows by descending nutrition, ties in row order
+    dish: np.ndarray  # equal for rows with the same title (case-insensitive), e.g. duplicate imports
+    rows: Dict[int, int]  # recipe id -> row
+
+    @classmethod
+    def from_entries(cls, entries: Tuple[IndexedRecipe, ...], matrix: MacroMatrix) -> "RecipeColumns":
+        n = len(entries)
+        ids = np.fromiter((e.id for e in entries), dtype=np.int64, count=n)
+        macros = matrix.gather(ids)
+        protein = macros[:, 1].astype(np.float64)
+        calories = macros[:, 0].astype(np.float64)
+        nutrition = nutrition_fit_batch(protein, calories)
+        return cls(
+            entries=entries,
+            ids=ids,
+            macros=macros,
+            protein=protein,
+            calories=calories,
+            time_minutes=np.fromiter((e.time_minutes or 15 for e in entries), dtype=np.float64, count=n),
+            n_ingredients=np.fromiter((len(e.ingredient_set) for e in entries), dtype=np.float64, count=n),
+            nutrition=nutrition,
+            by_nutrition=np.argsort(-nutrition, kind="stable"),
+            dish=np.unique(np.array([e.title.strip().lower() for e in entries], dtype=object), return_inverse=True)[1]
+            if n else np.zeros(0, dtype=np.int64),
+            rows={e.id: i for i, e in enumerate(entries)},
+        )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def _entry(r: Recipe, macros: Dict[str, int]) -> IndexedRecipe:
+    return IndexedRecipe(
+        id=r.id,
+        title=r.title or "",
+        ingredients=r.ingredients or "",
+        ingredient_set=frozenset(parse_ingredients(r.ingredients)),
+        macros=macros,
+        time_minutes=r.time_minutes,
+    )
+
+
+def _by_ingredient(entries: Iterable[IndexedRecipe]) -> Dict[str, Set[int]]:
+    out: Dict[str, Set[int]] = {}
+    for e in entries:
+        for name in e.ingredient_set:
+            out.setdefault(name, set()).add(e.id)
+    return out
+
+
+def _document(e: IndexedRecipe) -> str:
+    return f"{e.title} {e.ingredients}"
+
+
+class RecipeIndex:
+    """
+    Process-wide, read-mostly view of the recipe catalog.
+
+    Built once (at startup or on first use), then kept in sync by the write
+    endpoints via upsert. Readers get an immutable snapshot tuple, so
+    a request never sees a half-applied write.
+
+    Alongside the entries it keeps an ingredient -> recipe-id posting list,
+    so pantry overlap is counted from the pantry's postings only, and a BM25
+    text index over title + ingredients for query relevance.
+
+    Macros live in a MacroMatrix (recipe id -> float32 row). It is persisted
+    at MACRO_MATRIX_PATH, so a restart reuses it instead of re-estimating.
+
+    `version` goes up on every build and write, so cached results computed
+    from an older catalog can be told apart.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[int, IndexedRecipe] = {}
+        self._snapshot: Tuple[IndexedRecipe, ...] = ()
+        self._postings: Dict[str, FrozenSet[int]] = {}
+        self._columns: Optional[RecipeColumns] = None
+        self._text = TextIndex()
+        self._macros = MacroMatrix()
+        self._macros_dirty = False
+        self._built = False
+        self._version = 0
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def build(self, db: Session) -> None:
+        rows = db.query(Recipe).order_by(Recipe.id).all()
+        matrix, _ = load_or_build(db, rows, get_settings().MACRO_MATRIX_PATH)
+        values = matrix.gather(np.fromiter((r.id for r in rows), dtype=np.int64, count=len(rows)))
+        entries = {r.id: _entry(r, _macros_dict(v)) for r, v in zip(rows, values)}
+        postings: Dict[str, Set[int]] = {}
+        for e in entries.values():
+            for name in e.ingredient_set:
+                postings.setdefault(name, set()).add(e.id)
+        text = TextIndex()
+        text.build((e.id, _document(e)) for e in entries.values())
+        with self._lock:
+            self._entries = entries
+            self._snapshot = tuple(entries.values())
+            self._postings = {name: frozenset(ids) for name, ids in postings.items()}
+            self._columns = None
+            self._text = text
+            self._macros = matrix
+            self._macros_dirty = False
+            self._built = True
+            self._version += 1
+
+    def ensure_built(self, db: Session) -> None:
+        if not self._built:
+            self.build(db)
+
+    def upsert(self, r: Recipe) -> None:
+        self.upsert_many([r])
+
+    def upsert_many(self, rows: Iterable[Recipe]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        values = resolve_macros(rows)
+        new = [_entry(r, _macros_dict(v)) for r, v in zip(rows, values)]
+        with self._lock:
+            # Before the first build there is nothing to keep in sync.
+            if not self._built:
+                return
+            old = [o for o in (self._entries.get(e.id) for e in new) if o is not None]
+            self._unpost(*old)
+            for e in new:
+                self._entries[e.id] = e
+            self._post(*new)
+            self._text.update(docs=[(e.id, _document(e)) for e in new])
+            self._macros = self._macros.upsert((e.id for e in new), values)
+            self._macros_dirty = True
+            self._snapshot = tuple(self._entries.values())
+            self._columns = None
+            self._version += 1
+
+    # Posting sets are replaced, never mutated, so concurrent readers are safe.
+    # Changes are grouped per ingredient so a batch copies each set once.
+    def _post(self, *entries: IndexedRecipe) -> None:
+        for name, ids in _by_ingredient(entries).items():
+            self._postings[name] = self._postings.get(name, frozenset()) | ids
+
+    def _unpost(self, *entries: IndexedRecipe) -> None:
+        for name, gone in _by_ingredient(entries).items():
+            ids = self._postings.get(name, frozenset()) - gone
+            if ids:
+                self._postings[name] = ids
+            else:
+                self._postings.pop(name, None)
+
+    def entries(self) -> Tuple[IndexedRecipe, ...]:
+        return self._snapshot
+
+    def get(self, recipe_id: int) -> Optional[IndexedRecipe]:
+        return self._entries.get(recipe_id)
+
+    def columns(self) -> RecipeColumns:
+        """NumPy columns for the current snapshot, rebuilt lazily after a write."""
+        cols = self._columns
+        if cols is None or cols.entries is not self._snapshot:
+            with self._lock:
+                cols = RecipeColumns.from_entries(self._snapshot, self._macros)
+                self._columns = cols
+        return cols
+
+    def save_macros(self, db: Session) -> None:
+        """Persist the macro matrix if writes changed it since the last save."""
+        path = get_settings().MACRO_MATRIX_PATH
+        with self._lock:
+            if not (path and self._built and self._macros_dirty):
+                return
+            self._macros.save(path, db)
+            self._macros_dirty = False
+
+    def overlap_counts(self, pantry: Iterable[str]) -> Dict[int, int]:
+        """recipe_id -> number of pantry items it uses; recipes with no overlap are absent."""
+        counts: Counter = Counter()
+        for name in set(pantry):
+            counts.update(self._postings.get(name, ()))
+        return counts
+
+    def text_scores(self, query: str) -> Dict[int, float]:
+        """recipe_id -> BM25 relevance for query; non-matching recipes are absent."""
+        return self._text.scores(query)
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+
+recipe_index = RecipeIndex()
@@ -0,0 +1,123 @@
+# apps/api/app/services/response_cache.py
+"""
+Result cache for the ranking endpoints (/recipes/suggest, /recipes/search).
+
+A key is (endpoint, normalized params, owner, catalog version, pantry
+version):
+  - the catalog version is RecipeIndex.version, bumped by every recipe write
+    and macro update;
+  - the pantry version comes from pantry_state(), bumped by every pantry
+    write in this process and by a reload that finds the rows changed.
+A write therefore never needs to find the cached results it makes stale.
+They stop being asked for and age out of the LRU, which is bounded by entry
+count and total body bytes.
+
+The ETag is a hash of the key plus a per-process nonce, because the
+counters restart at zero with the process. A matching If-None-Match is
+answered 304 from the key alone, before any ranking work and even if the
+body has been evicted. Building the key needs the pantry version. That
+costs no query while the owner's pantry_cache entry is fresh, and one
+pantry query once it is older than PANTRY_CACHE_TTL_SECONDS.
+"""
+from __future__ import annotations
+
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from app.core.config import get_settings
+
+_EPOCH = secrets.token_hex(8)
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    etag: str
+
+
+def etag_for(key: Tuple[Hashable, ...]) -> str:
+    return '"' + hashlib.sha1(repr((_EPOCH, key)).encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison of an If-None-Match header against etag."""
+    if not if_none_match:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[Hashable, ...], CachedBody]" = OrderedDict()
+        self._bytes = 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[CachedBody]:
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hit
+
+    def put(self, key: Tuple[Hashable, ...], body: bytes) -> CachedBody:
+        entry = CachedBody(body, etag_for(key))
+        if len(body) > self.max_bytes or self.max_entries <= 0:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= len(dropped.body)
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_settings = get_settings()
+response_cache = ResponseCache(_settings.RESPONSE_CACHE_MAX_ENTRIES, _settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+async def cached_json(
+    key: Tuple[Hashable, ...], if_none_match: Optional[str], compute: Callable[[], Awaitable[Any]]
+) -> Response:
+    """
+    304 if the client already holds key's ETag, else the cached body, else
+    compute() rendered as JSON and cached. no-cache makes browsers
+    revalidate every time, which costs them a 304 until the data changes.
+    """
+    etag = etag_for(key)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    hit = response_cache.get(key)
+    if hit is None:
+        hit = response_cache.put(key, JSONResponse(await compute()).body)
+    return Response(hit.body, media_type="application/json", headers=headers)
@@ -0,0 +1,101 @@
+# apps/api/app/services/text_index.py
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def tokenize(s: str) -> List[str]:
+    return _TOKEN_RE.findall((s or "").lower())
+
+
+class TextIndex:
+    """
+    Inverted index with Okapi BM25 scoring.
+
+    term -> {doc_id: term frequency}; document frequency is the posting
+    length, so a query only touches the postings of its own terms.
+    Postings are copied on write (once per term per batch) so readers can
+    iterate them while a write is applied.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+
+    def build(self, docs: Iterable[Tuple[int, str]]) -> None:
+        postings: Dict[str, Dict[int, int]] = {}
+        doc_terms: Dict[int, Tuple[str, ...]] = {}
+        doc_len: Dict[int, int] = {}
+        for doc_id, text in docs:
+            tokens = tokenize(text)
+            tf = Counter(tokens)
+            for term, n in tf.items():
+                postings.setdefault(term, {})[doc_id] = n
+            doc_terms[doc_id] = tuple(tf)
+            doc_len[doc_id] = len(tokens)
+        self._postings, self._doc_terms, self._doc_len = postings, doc_terms, doc_len
+        self._total_len = sum(doc_len.values())
+
+    def update(self, docs: Iterable[Tuple[int, str]] = (), remove: Iterable[int] = ()) -> None:
+        """Add/replace docs and drop removed ids; callers serialize writes."""
+        changes: Dict[str, Dict[int, int]] = {}  # term -> {doc_id: tf, 0 = delete}
+
+        def drop(doc_id: int) -> None:
+            for term in self._doc_terms.pop(doc_id, ()):
+                changes.setdefault(term, {})[doc_id] = 0
+            self._total_len -= self._doc_len.pop(doc_id, 0)
+
+        for doc_id in remove:
+            drop(doc_id)
+        for doc_id, text in docs:
+            drop(doc_id)
+            tokens = tokenize(text)
+            tf = Counter(tokens)
+            for term, n in tf.items():
+                changes.setdefault(term, {})[doc_id] = n
+            self._doc_terms[doc_id] = tuple(tf)
+            self._doc_len[doc_id] = len(tokens)
+            self._total_len += len(tokens)
+
+        for term, delta in changes.items():
+            posting = dict(self._postings.get(term, {}))
+            for doc_id, n in delta.items():
+                if n:
+                    posting[doc_id] = n
+                else:
+                    posting.pop(doc_id, None)
+            if posting:
+                self._postings[term] = posting
+            else:
+                self._postings.pop(term, None)
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """BM25 score per matching doc; docs matching no query term are absent."""
+        n_docs = len(self._doc_len)
+        if not n_docs:
+            return {}
+        avgdl = max(self._total_len / n_docs, 1e-9)
+        k1, b = self.k1, self.b
+        out: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in posting.items():
+                norm = k1 * (1 - b + b * self._doc_len.get(doc_id, 0) / avgdl)
+                out[doc_id] = out.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return out
+
+    def __len__(self) -> int:
+        return len(self._doc_len)